@@ -0,0 +1,74 @@
+"""
+Lazy asset registry.
+
+Images and sounds are registered by name with a loader and only decoded the
+first time they are asked for. ``preload_step`` warms whatever is still
+pending a few milliseconds at a time, so it can run from the main loop while
+the menu is already on screen (pygbag has no threads to do this in).
+"""
+
+import time
+from collections.abc import Mapping
+
+
+class AssetRegistry:
+    """Name -> asset store whose entries are loaded on first access."""
+
+    def __init__(self):
+        self._loaders = {}  # name -> zero-argument loader
+        self._assets = {}   # name -> loaded asset
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+
+    def get(self, name):
+        try:
+            return self._assets[name]
+        except KeyError:
+            asset = self._loaders[name]()
+            self._assets[name] = asset
+            return asset
+
+    def is_loaded(self, name):
+        return name in self._assets
+
+    def pending(self):
+        """Names registered but not loaded yet, in registration order."""
+        return [name for name in self._loaders if name not in self._assets]
+
+    def preload_step(self, budget_sec=0.004):
+        """
+        Load pending assets until ``budget_sec`` has been spent.
+        At least one asset is loaded per call. Returns how many are still pending.
+        """
+        deadline = time.perf_counter() + budget_sec
+        pending = self.pending()
+        for i, name in enumerate(pending):
+            self.get(name)
+            if time.perf_counter() >= deadline:
+                return len(pending) - i - 1
+        return 0
+
+    def preload_all(self):
+        for name in self.pending():
+            self.get(name)
+
+    def __contains__(self, name):
+        return name in self._loaders
+
+
+class LazyAssetMap(Mapping):
+    """Read-only dict view (key -> asset name) that loads values on lookup."""
+
+    def __init__(self, registry, names):
+        self._registry = registry
+        self._names = dict(names)
+
+    def __getitem__(self, key):
+        return self._registry.get(self._names[key])
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
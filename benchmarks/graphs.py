@@ -0,0 +1,134 @@
+"""
+Graph benchmark: milliseconds per genome to layer a feed-forward network.
+
+Random feed-forward genomes with hundreds of hidden nodes (the game's six
+inputs and two outputs, links only from lower to higher nodes, some hidden
+nodes left as dead ends) are passed to neat.graphs.required_for_output and
+feed_forward_layers, and to the connection-scanning versions they replaced
+(kept below to time against). Results are checked to be identical.
+FeedForwardNetwork.create, which calls them, is timed too.
+
+    python -m benchmarks.graphs [--hidden N [N ...]] [--genomes N]
+"""
+
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("DFA_HEADLESS", "1")
+
+import neat
+from neat.graphs import feed_forward_layers, required_for_output
+
+CONFIG_PATH = "neat_config.ini"
+
+
+def scan_required_for_output(inputs, outputs, connections):
+    """neat.graphs.required_for_output before adjacency lists."""
+    required = set(outputs)
+    s = set(outputs)
+    while True:
+        t = {a for (a, b) in connections if b in s and a not in s}
+        if not t:
+            break
+        layer_nodes = {x for x in t if x not in inputs}
+        if not layer_nodes:
+            break
+        required = required.union(layer_nodes)
+        s = s.union(t)
+    return required
+
+
+def scan_feed_forward_layers(inputs, outputs, connections):
+    """neat.graphs.feed_forward_layers before adjacency lists."""
+    required = scan_required_for_output(inputs, outputs, connections)
+    nodes_with_inputs = {b for a, b in connections}
+    bias_neurons = required - nodes_with_inputs
+    layers = []
+    potential_input = set(inputs) | bias_neurons
+    if bias_neurons:
+        layers.append(bias_neurons.copy())
+    while True:
+        c = {b for (a, b) in connections if a in potential_input and b not in potential_input}
+        next_layer = set()
+        for n in c:
+            connections_to_n = [(a, b) for (a, b) in connections if b == n and a in required]
+            if n in required and all(a in potential_input for (a, b) in connections_to_n):
+                next_layer.add(n)
+        if not next_layer:
+            break
+        layers.append(next_layer)
+        potential_input = potential_input.union(next_layer)
+    return layers, required
+
+
+def random_genome(config, hidden, rng):
+    """A feed-forward genome with ``hidden`` hidden nodes and about 3 links into each node."""
+    gc = config.genome_config
+    genome = config.genome_type(0)
+    hidden_keys = list(range(len(gc.output_keys), len(gc.output_keys) + hidden))
+    for key in gc.output_keys + hidden_keys:
+        genome.nodes[key] = genome.create_node(gc, key)
+
+    # Node order: inputs, hidden, outputs; links only run forwards in it.
+    order = gc.input_keys + hidden_keys + gc.output_keys
+    for j in range(len(gc.input_keys), len(order)):
+        for i in rng.sample(range(j), min(j, 3)):
+            key = (order[i], order[j])
+            genome.connections[key] = genome.create_connection(gc, key[0], key[1], len(genome.connections))
+    # Leave a few hidden nodes with no path to an output.
+    for key in rng.sample(hidden_keys, hidden // 10):
+        for conn_key in [k for k in genome.connections if k[0] == key]:
+            del genome.connections[conn_key]
+    return genome
+
+
+def timed(fn, *args, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return result, (time.perf_counter() - t0) * 1000 / repeat
+
+
+def run(hidden_sizes=(50, 200, 500), genomes=5):
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                         neat.DefaultSpeciesSet, neat.DefaultStagnation, CONFIG_PATH)
+    inputs, outputs = config.genome_config.input_keys, config.genome_config.output_keys
+    rng = random.Random(0)
+
+    print(f"{'hidden':>6} {'links':>6} {'layers':>6} {'scan ms':>9} {'adjacency ms':>13} "
+          f"{'speed-up':>9} {'create ms':>10}")
+    for hidden in hidden_sizes:
+        scan = fast = create = 0.0
+        links = depth = 0
+        for _ in range(genomes):
+            genome = random_genome(config, hidden, rng)
+            connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+            old, old_ms = timed(scan_feed_forward_layers, inputs, outputs, connections)
+            new, new_ms = timed(feed_forward_layers, inputs, outputs, connections, repeat=10)
+            if new != old or required_for_output(inputs, outputs, connections) != old[1]:
+                print("  warning: results differ from the connection-scanning versions")
+            _, create_ms = timed(neat.nn.FeedForwardNetwork.create, genome, config, repeat=10)
+            scan += old_ms
+            fast += new_ms
+            create += create_ms
+            links += len(connections)
+            depth += len(new[0])
+        n = genomes
+        print(f"{hidden:>6} {links // n:>6} {depth // n:>6} {scan / n:>9.2f} {fast / n:>13.3f} "
+              f"{scan / fast:>8.0f}x {create / n:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hidden", type=int, nargs="+", default=[50, 200, 500],
+                        help="hidden nodes per genome (default: %(default)s)")
+    parser.add_argument("--genomes", type=int, default=5,
+                        help="genomes per size (default: %(default)s)")
+    args = parser.parse_args(argv)
+    run(args.hidden, args.genomes)
+
+
+if __name__ == "__main__":
+    main()
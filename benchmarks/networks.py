@@ -0,0 +1,110 @@
+"""
+Network benchmark: microseconds per input vector, interpreted vs compiled vs batched.
+
+Builds every genome of a population evolved for a few generations (random
+fitness, the game's neat_config.ini, structural mutation turned up so the
+networks grow hidden nodes) plus the game's trained winner, if there is
+one, as both a neat.nn.FeedForwardNetwork and a
+neat.nn.CompiledFeedForwardNetwork, and times activate() on the six sensor
+inputs a NEAT car feeds it every frame. Outputs are checked to be equal.
+The batched row evaluates ``--calls`` input vectors per network with one
+FeedForwardNetwork.activate_batch() call.
+
+    python -m benchmarks.networks [--generations N] [--calls N]
+"""
+
+import argparse
+import os
+import pickle
+import random
+import time
+
+os.environ.setdefault("DFA_HEADLESS", "1")
+
+import numpy as np
+
+import neat
+from neat.nn import CompiledFeedForwardNetwork, FeedForwardNetwork
+
+CONFIG_PATH = "neat_config.ini"
+WINNER_PATH = "assets/winner_genome.pkl"
+
+
+def evolved_genomes(config, generations, seed=0):
+    random.seed(seed)
+    pop = neat.Population(config)
+    for _ in range(generations):
+        pop.run(lambda genomes, _: [setattr(g, "fitness", random.random()) for _, g in genomes], 1)
+    genomes = list(pop.population.values())
+    if os.path.exists(WINNER_PATH):
+        with open(WINNER_PATH, "rb") as f:
+            genomes.append(pickle.load(f))
+    return genomes
+
+
+def per_call_us(nets, inputs, calls):
+    t0 = time.perf_counter()
+    for net in nets:
+        activate = net.activate
+        for _ in range(calls):
+            activate(inputs)
+    return (time.perf_counter() - t0) * 1e6 / (len(nets) * calls)
+
+
+def per_row_us(nets, inputs, calls):
+    batch = np.tile(inputs, (calls, 1))
+    t0 = time.perf_counter()
+    for net in nets:
+        net.activate_batch(batch)
+    return (time.perf_counter() - t0) * 1e6 / (len(nets) * calls)
+
+
+def run(generations=20, calls=2000):
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                         neat.DefaultSpeciesSet, neat.DefaultStagnation, CONFIG_PATH)
+    config.genome_config.node_add_prob = 0.3
+    config.genome_config.conn_add_prob = 0.5
+    genomes = evolved_genomes(config, generations)
+
+    interpreted = [FeedForwardNetwork.create(g, config) for g in genomes]
+    t0 = time.perf_counter()
+    compiled = [CompiledFeedForwardNetwork.create(g, config) for g in genomes]
+    create_us = (time.perf_counter() - t0) * 1e6 / len(genomes)
+
+    rng = random.Random(1)
+    inputs = [rng.uniform(-1.0, 1.0) for _ in range(len(config.genome_config.input_keys))]
+    for a, b in zip(interpreted, compiled):
+        if a.activate(inputs) != b.activate(inputs):
+            print("  warning: compiled outputs differ from FeedForwardNetwork.activate")
+            break
+    for net in interpreted:
+        if not np.allclose(net.activate_batch([inputs])[0], net.activate(inputs)):
+            print("  warning: activate_batch outputs differ from FeedForwardNetwork.activate")
+            break
+
+    nodes = sum(len(net.node_evals) for net in interpreted) / len(interpreted)
+    links = sum(len(e[5]) for net in interpreted for e in net.node_evals) / len(interpreted)
+    slow = per_call_us(interpreted, inputs, calls)
+    fast = per_call_us(compiled, inputs, calls)
+    batched = per_row_us(interpreted, inputs, calls)
+    print(f"{len(genomes)} networks, {nodes:.1f} nodes and {links:.1f} links on average")
+    print(f"{'network':>12} {'us/input':>10} {'speed-up':>9}")
+    print(f"{'interpreted':>12} {slow:>10.2f} {1.0:>8.1f}x")
+    print(f"{'compiled':>12} {fast:>10.2f} {slow / fast:>8.1f}x")
+    print(f"{'batched':>12} {batched:>10.2f} {slow / batched:>8.1f}x")
+    print(f"compiling a network takes {create_us:.0f} us, "
+          f"repaid after {create_us / max(slow - fast, 1e-9):.0f} calls")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--generations", type=int, default=20,
+                        help="generations to evolve before timing (default: %(default)s)")
+    parser.add_argument("--calls", type=int, default=2000,
+                        help="input vectors per network (default: %(default)s)")
+    args = parser.parse_args(argv)
+    run(args.generations, args.calls)
+
+
+if __name__ == "__main__":
+    main()
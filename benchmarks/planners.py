@@ -0,0 +1,95 @@
+"""
+Planner benchmark: nodes expanded, heap pushes and milliseconds per replan.
+
+Every level's DijkstraCar checkpoint legs (ASTAR_RACING_LINE plus the finish)
+are planned with each planner, exactly as the car would replan on reaching a
+checkpoint. Path lengths are checked to agree between the optimal planners;
+GBFS (GBFSDetourCar's greedy search) is not optimal and only reported.
+JPS counts jump points as expanded nodes; cells it scans between them show
+up in its time, not its expansions.
+
+    python -m benchmarks.planners [--repeat N]
+"""
+
+import argparse
+import os
+
+os.environ.setdefault("DFA_HEADLESS", "1")
+
+import resources
+from planning import SearchStats, astar_path, dijkstra_path, jps_path, nearest_free
+
+PLANNERS = {
+    "Dijkstra": dijkstra_path,
+    "A*": astar_path,
+    "JPS": jps_path,
+}
+OPTIMAL = ("Dijkstra", "A*", "JPS")
+
+
+def gbfs_planner():
+    """GBFSDetourCar.greedy_best_first with the car's own settings, as a planner."""
+    car = resources.create_GBFS_car()
+
+    def gbfs_path(grid, start, goal, stats=None):
+        return car.greedy_best_first(nearest_free(grid, start), nearest_free(grid, goal),
+                                     allow_diag=car.allow_diag, stats=stats) or []
+    return gbfs_path
+
+
+def path_cost(cells):
+    return sum(
+        1.0 if abs(r0 - r1) + abs(c0 - c1) == 1 else 1.414
+        for (r0, c0), (r1, c1) in zip(cells, cells[1:])
+    )
+
+
+def checkpoint_legs(level):
+    """(start, goal) grid cells for each checkpoint-to-checkpoint replan."""
+    resources.load_track_for_level(level)
+    size = resources.GRID_SIZE
+    points = resources.ASTAR_RACING_LINE + [resources.FINISH_POSITION]
+    cells = [(int(y / size), int(x / size)) for x, y in points]
+    return [(cells[i - 1], cells[i]) for i in range(len(cells))]
+
+
+def run(repeat=1):
+    print(f"{'level':>5} {'planner':>10} {'legs':>5} {'expanded':>10} {'pushed':>10} "
+          f"{'ms/replan':>10} {'length':>8}")
+    for level in sorted(resources.LEVEL_DEFINITIONS):
+        legs = checkpoint_legs(level)
+        grid = resources.GRID
+        reference = None
+        planners = dict(PLANNERS, GBFS=gbfs_planner())
+        for name, planner in planners.items():
+            expanded = pushed = 0
+            seconds = 0.0
+            costs = []
+            for _ in range(repeat):
+                for start, goal in legs:
+                    stats = SearchStats()
+                    path = planner(grid, start, goal, stats)
+                    expanded += stats.expanded
+                    pushed += stats.pushed
+                    seconds += stats.seconds
+                    costs.append(round(path_cost(path), 6) if path else None)
+            if name in OPTIMAL:
+                if reference is None:
+                    reference = costs
+                elif costs != reference:
+                    print(f"  warning: {name} path lengths differ from {OPTIMAL[0]}")
+            n = len(legs) * repeat
+            length = sum(c for c in costs if c is not None) / repeat
+            print(f"{level:>5} {name:>10} {len(legs):>5} {expanded // repeat:>10} "
+                  f"{pushed // repeat:>10} {seconds * 1000 / n:>10.2f} {length:>8.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per leg (default: %(default)s)")
+    args = parser.parse_args(argv)
+    run(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Struct-of-arrays car state.
+
+A ``CarBatch`` keeps the kinematic state of many cars in one NumPy array per
+field and moves them all with a single vectorised ``step``. A car attached to
+a batch becomes a view onto its row: ``car.x`` reads and writes
+``batch.columns["x"][row]``, so per-car code (collisions, fitness, drawing,
+AbstractCar.move) keeps working on batched cars unchanged.
+
+Only cars that mix in ``BatchedCar`` can be attached; other cars keep plain
+instance attributes and don't pay for the descriptor lookups.
+"""
+
+import numpy as np
+
+FIELDS = ("x", "y", "angle", "vel", "max_vel", "acceleration", "rotation_vel")
+POSE = ("x", "y", "angle")
+
+
+class BatchField:
+    """
+    Car attribute kept in the instance dict, or in the car's CarBatch row
+    while it is attached to one.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, car, owner=None):
+        if car is None:
+            return self
+        batch = car._batch
+        if batch is None:
+            try:
+                return car.__dict__[self.name]
+            except KeyError:
+                raise AttributeError(self.name) from None
+        return batch.columns[self.name].item(car._row)
+
+    def __set__(self, car, value):
+        batch = car._batch
+        if batch is None:
+            car.__dict__[self.name] = value
+        else:
+            batch.columns[self.name][car._row] = value
+
+
+class BatchedCar:
+    """
+    Mixin (before AbstractCar in the bases) for cars a CarBatch can attach:
+    kinematic state in BatchFields, and poses saved in the batch.
+    """
+    x = BatchField()
+    y = BatchField()
+    angle = BatchField()
+    vel = BatchField()
+    max_vel = BatchField()
+    acceleration = BatchField()
+    rotation_vel = BatchField()
+    _batch = None
+    _row = -1
+
+    def save_pose(self):
+        if self._batch is not None:
+            self._batch.save_poses([self._row])
+        else:
+            super().save_pose()
+
+    def saved_pose(self):
+        if self._batch is not None:
+            return self._batch.saved_pose(self._row)
+        return super().saved_pose()
+
+
+class CarBatch:
+    """Kinematic state of up to ``capacity`` cars (grows when full)."""
+
+    def __init__(self, capacity=16):
+        self.size = 0
+        self.columns = {name: np.zeros(max(1, capacity)) for name in FIELDS}
+        self.saved = {name: np.zeros(max(1, capacity)) for name in POSE}  # see save_poses()
+
+    def __len__(self):
+        return self.size
+
+    def attach(self, car):
+        """Move the car's state into a new row and make the car a view of it."""
+        if not isinstance(car, BatchedCar):
+            raise TypeError(f"{type(car).__name__} is not a BatchedCar")
+        if car._batch is not None:
+            car._batch.detach(car)
+        row = self.size
+        if row == len(self.columns["x"]):
+            for arrays in (self.columns, self.saved):
+                for name, column in arrays.items():
+                    grown = np.zeros(2 * len(column))
+                    grown[:row] = column
+                    arrays[name] = grown
+        for name in FIELDS:
+            self.columns[name][row] = car.__dict__.pop(name)
+        for name in POSE:
+            self.saved[name][row] = self.columns[name][row]
+        car._batch, car._row = self, row
+        self.size += 1
+        return row
+
+    def detach(self, car):
+        """Copy the car's row back onto the car. The row itself is not reused."""
+        values = {name: float(self.columns[name][car._row]) for name in FIELDS}
+        car._batch, car._row = None, -1
+        car.__dict__.update(values)
+
+    def save_poses(self, rows=None):
+        """AbstractCar.save_pose() for every car in ``rows`` (default: all of them)."""
+        if rows is None:
+            rows = slice(0, self.size)
+        for name in POSE:
+            self.saved[name][rows] = self.columns[name][rows]
+
+    def saved_pose(self, row):
+        return tuple(self.saved[name].item(row) for name in POSE)
+
+    def rows(self, cars):
+        """Row indices of ``cars`` (all attached to this batch) as an array."""
+        return np.fromiter((car._row for car in cars), dtype=np.intp, count=len(cars))
+
+    def step(self, rows=None):
+        """
+        AbstractCar.move() for every car in ``rows`` (default: all of them):
+        advance each one ``vel`` pixels along its heading.
+        """
+        if rows is None:
+            rows = slice(0, self.size)
+        c = self.columns
+        radians = np.radians(c["angle"][rows])
+        vel = c["vel"][rows]
+        c["y"][rows] -= np.cos(radians) * vel
+        c["x"][rows] -= np.sin(radians) * vel
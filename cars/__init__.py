@@ -6,6 +6,7 @@ from .computer_car import ComputerCar
 from .gbfs_detour_car import GBFSDetourCar
 from .neat_car import NEATCar
 from .dijkstra_car import DijkstraCar
+from .jps_car import JPSCar
 
 __all__ = [
     'AbstractCar',
@@ -14,4 +15,5 @@ __all__ = [
     'GBFSDetourCar',
     'NEATCar',
     'DijkstraCar',
+    'JPSCar',
 ]
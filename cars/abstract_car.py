@@ -1,6 +1,7 @@
 import math
-import pygame
+import resources
 from resources import blit_rotate_center
+from sprite_atlas import atlas_for
 
 
 class AbstractCar:
@@ -10,6 +11,13 @@ class AbstractCar:
     arguments so callers (e.g. factories) can supply different images.
     """
 
+    # False: collide with the upright sprite's mask (original behaviour).
+    # True: collide with the sprite rotated to the car's heading, using the
+    # atlas's quantised rotation table.
+    ROTATED_COLLISION = False
+
+    _prev_pose = None  # (x, y, angle) before the latest sim step, see save_pose()
+
     def __init__(self, img, start_pos, max_vel, rotation_vel):
         self.img = img
         self.START_POS = start_pos
@@ -34,7 +42,32 @@ class AbstractCar:
             self.angle -= self.rotation_vel
 
     def draw(self, win):
-        blit_rotate_center(win, self.img, (self.x, self.y), self.angle)
+        x, y, angle = self.render_pose()
+        blit_rotate_center(win, self.img, (x, y), angle)
+
+    def save_pose(self):
+        """Record the pose at the start of a sim step, for render_pose()."""
+        self._prev_pose = (self.x, self.y, self.angle)
+
+    def saved_pose(self):
+        """(x, y, angle) recorded by the latest save_pose(), or None."""
+        return self._prev_pose
+
+    def render_pose(self, alpha=None):
+        """
+        (x, y, angle) to draw at: ``alpha`` (default: the sim clock's) of the
+        way from the saved pose to the current one.
+        """
+        prev = self.saved_pose()
+        if prev is None:
+            return self.x, self.y, self.angle
+        if alpha is None:
+            alpha = resources.SIM_CLOCK.alpha
+        px, py, pangle = prev
+        turn = (self.angle - pangle + 180) % 360 - 180
+        return (px + (self.x - px) * alpha,
+                py + (self.y - py) * alpha,
+                pangle + turn * alpha)
 
     def move_forward(self):
         self.vel = min(self.vel + self.acceleration, self.max_vel)
@@ -52,16 +85,22 @@ class AbstractCar:
         self.x -= horizontal
 
     def collide(self, mask, x=0, y=0):
-        car_mask = pygame.mask.from_surface(self.img)
-        car_mask = car_mask.scale(
-            (int(car_mask.get_size()[0] * 0.85), int(car_mask.get_size()[1] * 0.85))
-        )
-        offset = (
-            int(self.x - x + self.img.get_width() * 0.075),
-            int(self.y - y + self.img.get_height() * 0.075),
-        )
+        atlas = atlas_for(self.img)
+        if self.ROTATED_COLLISION:
+            car_mask, (dx, dy) = atlas.rotated_collision_mask(self.sprite_angle())
+            offset = (int(self.x - x + dx), int(self.y - y + dy))
+        else:
+            car_mask = atlas.collision_mask
+            offset = (
+                int(self.x - x + self.img.get_width() * 0.075),
+                int(self.y - y + self.img.get_height() * 0.075),
+            )
         return mask.overlap(car_mask, offset)
 
+    def sprite_angle(self):
+        """Angle (degrees, counter-clockwise) the sprite is drawn at."""
+        return self.angle
+
     def set_start_pos(self, pos):
         self.START_POS = pos
 
@@ -69,6 +108,7 @@ class AbstractCar:
         self.x, self.y = self.START_POS
         self.angle = 0
         self.vel = 0
+        self.save_pose()
     
     def get_centre(self):
         w, h = self.img.get_size()
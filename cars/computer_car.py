@@ -45,7 +45,8 @@ class ComputerCar(AbstractCar):
 
     def draw(self, win, show_points=True):  # shows the car and optionally the path points
         from resources import blit_rotate_center
-        blit_rotate_center(win, self.img, (self.x, self.y), self.angle)
+        x, y, angle = self.render_pose()
+        blit_rotate_center(win, self.img, (x, y), angle)
         if show_points:
             self.draw_points(win)
 
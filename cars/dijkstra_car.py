@@ -1,19 +1,24 @@
 import math
 import pygame
-import heapq
+from planning import SearchStats, astar_path, dijkstra_path, flow_fields_for, leg_cache_for, smooth_path
 from .abstract_car import AbstractCar
 
 _CHECKPOINT_OVERLAY_CACHE = {}
 
 class DijkstraCar(AbstractCar):
     """
-    Computer-controlled car that uses Dijkstra's algorithm to navigate
-    through a grid-based track to reach checkpoints.
+    Computer-controlled car that plans shortest grid paths (Dijkstra flow
+    fields by default, or a per-checkpoint Dijkstra / A* search) to reach
+    checkpoints.
     """
+
+    # True: keep only the turning points of each planned path (line of sight
+    # over the wall clearance), cached per leg. False: one waypoint per cell.
+    SMOOTH_PATHS = True
     def __init__(self, img, start_pos, max_vel, rotation_vel,
                  path, grid_size=None, waypoint_reach=10,
                  checkpoint_radius=None, grid=None,
-                 track_border_mask=None, loop=True):
+                 track_border_mask=None, loop=True, planner="flow"):
         super().__init__(img, start_pos, max_vel, rotation_vel)
         self.CHECKPOINTS = path  # Expected path becomes checkpoints for Dijkstra to plan between
         self.WAYPOINT_REACH = waypoint_reach
@@ -23,11 +28,22 @@ class DijkstraCar(AbstractCar):
         self.GRID_SIZE = grid_size or 4
         self.loop = loop
         self.autonomous = True  # Always autonomous
+        # "flow": follow the per-level checkpoint flow fields (no search at race time)
+        # "dijkstra": run a fresh Dijkstra search at every checkpoint
+        # "astar": run a fresh A* search (octile heuristic) at every checkpoint
+        # "jps": Jump Point Search at every checkpoint (see JPSCar)
+        self.planner = planner
+        self.last_search = SearchStats()  # counters of the latest per-checkpoint search
+        # Set to a PlannerService to plan off the frame (see planner_service.py);
+        # None plans synchronously inside move().
+        self.planner_service = None
+        self._pending_plan = None  # (PlanFuture, checkpoint) while a plan is on its way
 
         self.vel = max_vel
         self.current_checkpoint = 0
         self.path = []  # Dijkstra-computed path
         self.current_point = 0
+        self._along = 0.0  # smoothed paths: how far the target has slid towards path[current_point]
         
         # Compute initial path to first checkpoint
         self._compute_path_to_checkpoint()
@@ -51,78 +67,68 @@ class DijkstraCar(AbstractCar):
         y = gx * self.GRID_SIZE + self.GRID_SIZE / 2
         return (x, y)
 
-    def _dijkstra_path(self, start_world, goal_world):
+    def _dijkstra_path(self, start_world, goal_world, stats=None):
         """
-        Compute shortest path using Dijkstra's algorithm.
-        Returns list of (x, y) world coordinates from start to goal.
+        Compute shortest path using Dijkstra's algorithm, counting its work
+        in ``stats``. Returns list of (x, y) world coordinates from start to goal.
         """
-        start_grid = self._world_to_grid(*start_world)
-        goal_grid = self._world_to_grid(*goal_world)
-        
-        rows, cols = len(self.GRID), len(self.GRID[0])
-        
-        # Check if start/goal are walkable
-        if not (0 <= start_grid[0] < rows and 0 <= start_grid[1] < cols):
-            return []
-        if not (0 <= goal_grid[0] < rows and 0 <= goal_grid[1] < cols):
-            return []
-        if not self.GRID[start_grid[0]][start_grid[1]]:
-            return []
-        if not self.GRID[goal_grid[0]][goal_grid[1]]:
-            return []
-        
-        # Dijkstra: (cost, node)
-        open_set = [(0, start_grid)]
-        visited = set()
-        came_from = {}
-        cost_so_far = {start_grid: 0}
-        
-        while open_set:
-            current_cost, current = heapq.heappop(open_set)
-            
-            if current in visited:
-                continue
-            visited.add(current)
-            
-            if current == goal_grid:
-                # Reconstruct path
-                path = []
-                node = current
-                while node in came_from:
-                    path.append(node)
-                    node = came_from[node]
-                path.append(start_grid)
-                path.reverse()
-                
-                # Convert grid path to world path
-                world_path = [self._grid_to_world(gx, gy) for gx, gy in path]
-                return world_path
-            
-            # Explore 8 neighbors (diagonal allowed)
-            cr, cc = current
-            neighbors = [
-                (cr - 1, cc), (cr + 1, cc), (cr, cc - 1), (cr, cc + 1),  # 4-neighbors
-                (cr - 1, cc - 1), (cr - 1, cc + 1), (cr + 1, cc - 1), (cr + 1, cc + 1)  # diagonals
-            ]
-            
-            for nr, nc in neighbors:
-                if not (0 <= nr < rows and 0 <= nc < cols):
-                    continue
-                if not self.GRID[nr][nc]:  # Blocked cell
-                    continue
-                if (nr, nc) in visited:
-                    continue
-                
-                # Cost: 1 for 4-neighbors, sqrt(2) for diagonals
-                move_cost = 1.0 if abs(nr - cr) + abs(nc - cc) == 1 else 1.414
-                new_cost = cost_so_far[current] + move_cost
-                
-                if (nr, nc) not in cost_so_far or new_cost < cost_so_far[(nr, nc)]:
-                    cost_so_far[(nr, nc)] = new_cost
-                    came_from[(nr, nc)] = current
-                    heapq.heappush(open_set, (new_cost, (nr, nc)))
-        
-        return []  # No path found
+        cells = dijkstra_path(self.GRID, self._world_to_grid(*start_world),
+                              self._world_to_grid(*goal_world), stats)
+        return [self._grid_to_world(gx, gy) for gx, gy in cells]
+
+    def _astar_path(self, start_world, goal_world, stats=None):
+        """Same as _dijkstra_path, searched with A* instead."""
+        cells = astar_path(self.GRID, self._world_to_grid(*start_world),
+                           self._world_to_grid(*goal_world), stats)
+        return [self._grid_to_world(gx, gy) for gx, gy in cells]
+
+    def _flow_field_path(self, start_world, goal_world):
+        """Shortest path read off the goal's cached flow field."""
+        cells = flow_fields_for(self.GRID).path(
+            self.GRID, self._world_to_grid(*start_world), self._world_to_grid(*goal_world)
+        )
+        return [self._grid_to_world(gx, gy) for gx, gy in cells]
+
+    def _plan(self, start_world, goal_world):
+        """
+        ``(world path to goal_world, SearchStats of the search)``. With
+        SMOOTH_PATHS the search result is string-pulled to its turning points
+        and cached per leg on the level. May run on the planner thread, so it
+        leaves the car's own state alone; callers store the stats.
+        """
+        stats = SearchStats()
+        if not self.SMOOTH_PATHS:
+            return self._search(start_world, goal_world, stats), stats
+        key = (self.planner, self._world_to_grid(*start_world), self._world_to_grid(*goal_world))
+        legs = leg_cache_for(self.GRID)
+        path = legs.get(key)
+        if path is None:
+            cells = [self._world_to_grid(x, y) for x, y in self._search(start_world, goal_world, stats)]
+            path = [self._grid_to_world(gx, gy) for gx, gy in smooth_path(self.GRID, cells)]
+            legs.put(key, path)
+        return list(path), stats
+
+    def _search(self, start_world, goal_world, stats=None):
+        if self.planner == "flow":
+            return self._flow_field_path(start_world, goal_world)
+        if self.planner == "astar":
+            return self._astar_path(start_world, goal_world, stats)
+        return self._dijkstra_path(start_world, goal_world, stats)
+
+    def warm_flow_fields(self, budget_sec=0.0):
+        """
+        Build the flow fields for this car's checkpoints ahead of the race:
+        queued on the planner service when the car has one, otherwise here
+        within ``budget_sec``. Returns how many are still missing (0 when not
+        using flow fields).
+        """
+        if self.planner != "flow":
+            return 0
+        goals = [self._world_to_grid(*cp) for cp in self.CHECKPOINTS]
+        fields = flow_fields_for(self.GRID)
+        if self.planner_service is not None:
+            return fields.warm_async(self.GRID, goals, self.planner_service)
+        return fields.warm(self.GRID, goals, budget_sec)
 
     def _compute_path_to_checkpoint(self):
         """Compute Dijkstra path to current checkpoint."""
@@ -134,8 +140,21 @@ class DijkstraCar(AbstractCar):
         
         checkpoint = self.CHECKPOINTS[self.current_checkpoint]
         start_pos = (self.x, self.y)
-        
-        new_path = self._dijkstra_path(start_pos, checkpoint)
+
+        if self.planner_service is not None:
+            future = self.planner_service.submit(self, self._plan, start_pos, checkpoint)
+            self._pending_plan = (future, checkpoint)
+            if not self.path or self.current_point >= len(self.path):
+                # Head straight for the checkpoint until the plan arrives.
+                self.path = [checkpoint]
+                self.current_point = 0
+                self._along = 0.0
+            return
+
+        path, self.last_search = self._plan(start_pos, checkpoint)
+        self._use_path(path, checkpoint)
+
+    def _use_path(self, new_path, checkpoint):
         if new_path:
             self.path = new_path
             self.current_point = 0
@@ -143,6 +162,16 @@ class DijkstraCar(AbstractCar):
             # Fallback: direct point if no path found
             self.path = [checkpoint]
             self.current_point = 0
+        self._along = 0.0
+
+    def _collect_plan(self):
+        """Switch to the pending off-frame plan once it has arrived."""
+        future, checkpoint = self._pending_plan
+        if future.done():
+            self._pending_plan = None
+            if not future.cancelled():
+                path, self.last_search = future.result()
+                self._use_path(path, checkpoint)
 
     # ------------------ MOVEMENT ------------------
     def calculate_angle(self, target_x, target_y):
@@ -163,6 +192,9 @@ class DijkstraCar(AbstractCar):
 
     def move(self):
         """Move along Dijkstra path, replanning at checkpoints."""
+        if self._pending_plan is not None:
+            self._collect_plan()
+
         # Replan if path is empty or exhausted
         if not self.path or self.current_point >= len(self.path):
             self.current_checkpoint += 1
@@ -172,7 +204,7 @@ class DijkstraCar(AbstractCar):
             if not self.path:
                 return
         
-        tx, ty = self.path[self.current_point]
+        tx, ty = self._target()
         
         # Rotate toward next waypoint
         self.calculate_angle(tx, ty)
@@ -197,12 +229,42 @@ class DijkstraCar(AbstractCar):
         
         # Update waypoint after movement
         if math.hypot(tx - self.x, ty - self.y) < self.WAYPOINT_REACH:
-            self.current_point += 1
+            self._advance_target()
+
+    def _target(self):
+        """
+        The point to steer at. On a smoothed path it slides along the segment
+        into path[current_point] a grid cell per step, as the per-cell
+        waypoints did, so the car still corners like on the full path.
+        """
+        tx, ty = self.path[self.current_point]
+        if self.SMOOTH_PATHS and self.current_point > 0:
+            px, py = self.path[self.current_point - 1]
+            length = math.hypot(tx - px, ty - py)
+            if self._along < length:
+                f = self._along / length
+                return px + (tx - px) * f, py + (ty - py) * f
+        return tx, ty
+
+    def _advance_target(self):
+        if self.SMOOTH_PATHS and self.current_point > 0:
+            px, py = self.path[self.current_point - 1]
+            tx, ty = self.path[self.current_point]
+            if self._along < math.hypot(tx - px, ty - py):
+                self._along += self.GRID_SIZE
+                return
+        self.current_point += 1
+        self._along = self.GRID_SIZE
+
+    def sprite_angle(self):
+        # Heading is measured clockwise here, pygame rotates counter-clockwise.
+        return -self.angle
 
     # ------------------ DEBUG DRAW ------------------
     def draw(self, win, show_points=True):
         from resources import blit_rotate_center, DEBUG_SHOW_CHECKPOINTS, CHECKPOINT_RADIUS
-        blit_rotate_center(win, self.img, (self.x, self.y), -self.angle)
+        x, y, angle = self.render_pose()
+        blit_rotate_center(win, self.img, (x, y), -angle)  # as sprite_angle()
         # Only show debug visualization if DEBUG_SHOW_CHECKPOINTS is True
         if show_points and DEBUG_SHOW_CHECKPOINTS:
             size = win.get_size()
@@ -230,7 +292,11 @@ class DijkstraCar(AbstractCar):
         self.TRACK_BORDER_MASK = resources.TRACK_BORDER_MASK
         self.GRID = resources.GRID
         self.reset()
+        if self.planner_service is not None:
+            self.planner_service.cancel(self)
+        self._pending_plan = None
         self.current_checkpoint = 0
         self.path = []
         self.current_point = 0
+        self._along = 0.0
         self._compute_path_to_checkpoint()
@@ -1,7 +1,10 @@
 import math
-import pygame
 import heapq
+import time
 from resources import raycast_mask, CHECKPOINT_RADIUS
+from planning import leg_cache_for, smooth_path
+from sprite_atlas import pose_collides
+from track_fields import clearance_map, mask_to_array
 from .abstract_car import AbstractCar
 
 
@@ -12,7 +15,12 @@ class GBFSDetourCar(AbstractCar):
     """
     START_POS = (165, 200)
 
-    def __init__(self, checkpoints, maxVel, maxRot, GRIDSIZE, WAYPOINT_REACH, CHECKPOINT_RADIUS, GRID, TRACK_BORDER_MASK, img):
+    # True: keep only the turning points of each GBFS path (line of sight over
+    # the wall clearance), cached per leg. False: one waypoint per cell.
+    SMOOTH_PATHS = True
+
+    def __init__(self, checkpoints, maxVel, maxRot, GRIDSIZE, WAYPOINT_REACH, CHECKPOINT_RADIUS, GRID, TRACK_BORDER_MASK, img,
+                 CLEARANCE=None):
         super().__init__(img, self.START_POS, maxVel, maxRot)
         
         # Basics
@@ -42,6 +50,13 @@ class GBFSDetourCar(AbstractCar):
         self.CHECKPOINT_RADIUS = CHECKPOINT_RADIUS
         self.GRID = GRID
         self.TRACK_BORDER_MASK = TRACK_BORDER_MASK
+        self.CLEARANCE = CLEARANCE  # per-cell clearance (see track_fields.clearance_map), built from the mask if None
+        self._cell_clearance = None  # CLEARANCE flattened to a list, row * cols + col
+
+        # Set to a PlannerService to plan off the frame (see planner_service.py);
+        # None plans synchronously inside move().
+        self.planner_service = None
+        self._pending_plan = None  # (PlanFuture, kind, goal_world) while a plan is on its way
 
         # Stuck detection
         self._last_dist = None
@@ -65,15 +80,20 @@ class GBFSDetourCar(AbstractCar):
         self.allow_diag = bool(TuningData[10]) # Either 0 or 1 to represent true or false
 
     # ------------------ HELPERS ------------------
-    def greedy_best_first(self, start, goal, allow_diag=True, clearance_weight=0.4, max_expansions=50000):
+    def greedy_best_first(self, start, goal, allow_diag=True, clearance_weight=0.4, max_expansions=50000,
+                          stats=None):
         """
         Pure Greedy Best-First Search (no path cost), biased by local clearance.
 
         Priority = h(n, goal) - clearance_weight * clearance(n)
 
         Returns: list of (row, col) nodes from start(exclusive) -> goal(inclusive), or None.
+        Fills ``stats`` (a planning.SearchStats) if given.
         """
-        rows, cols = len(self.GRID), len(self.GRID[0])
+        t0 = time.perf_counter()
+        pushed = 1
+        rows, cols = self.GRID.rows, self.GRID.cols
+        free = self.GRID.free
 
         def grid_to_world(rc):
             r, c = rc
@@ -81,19 +101,10 @@ class GBFSDetourCar(AbstractCar):
             y = r * self.GRIDSIZE + self.GRIDSIZE / 2
             return x, y
 
-        def local_clearance(rc, radius=6, step=2):
-            x, y = grid_to_world(rc)
-            width, height = self.TRACK_BORDER_MASK.get_size()
-            hits, samples = 0, 0
-            ix, iy = int(x), int(y)
-            for dx in range(-radius, radius+1, step):
-                for dy in range(-radius, radius+1, step):
-                    sx, sy = ix + dx, iy + dy
-                    if 0 <= sx < width and 0 <= sy < height:
-                        samples += 1
-                        if self.TRACK_BORDER_MASK.get_at((sx, sy)) != 0:
-                            hits += 1
-            return 0.0 if samples == 0 else (1.0 - hits / samples)
+        clearance = self.cell_clearance()
+
+        def local_clearance(rc):
+            return clearance[rc[0] * cols + rc[1]]
 
         def neighbors4(r, c):
             return [(r+1,c), (r-1,c), (r,c+1), (r,c-1)]
@@ -111,13 +122,13 @@ class GBFSDetourCar(AbstractCar):
             ]
             res = []
             for nr, nc in cand:
-                if 0 <= nr < rows and 0 <= nc < cols and self.GRID[nr][nc]:
+                if 0 <= nr < rows and 0 <= nc < cols and free[nr * cols + nc]:
                     res.append((nr, nc))
             for (nr, nc, o1, o2) in diags:
                 if (0 <= nr < rows and 0 <= nc < cols and
-                    self.GRID[nr][nc] and
-                    0 <= o1[0] < rows and 0 <= o1[1] < cols and self.GRID[o1[0]][o1[1]] and
-                    0 <= o2[0] < rows and 0 <= o2[1] < cols and self.GRID[o2[0]][o2[1]]):
+                    free[nr * cols + nc] and
+                    0 <= o1[0] < rows and 0 <= o1[1] < cols and free[o1[0] * cols + o1[1]] and
+                    0 <= o2[0] < rows and 0 <= o2[1] < cols and free[o2[0] * cols + o2[1]]):
                     res.append((nr, nc))
             return res
 
@@ -141,6 +152,9 @@ class GBFSDetourCar(AbstractCar):
                     path.append(current)
                     current = came_from[current]
                 path.reverse()
+                if stats is not None:
+                    stats.expanded, stats.pushed = expansions, pushed
+                    stats.seconds = time.perf_counter() - t0
                 return path
 
             r, c = current
@@ -150,15 +164,20 @@ class GBFSDetourCar(AbstractCar):
                     h = abs(nr - goal[0]) + abs(nc - goal[1])
                     p = h - clearance_weight * local_clearance((nr, nc))
                     heapq.heappush(open_set, (p, (nr, nc)))
+                    pushed += 1
                     came_from[(nr, nc)] = current
 
+        if stats is not None:
+            stats.expanded, stats.pushed = expansions, pushed
+            stats.seconds = time.perf_counter() - t0
         return None
 
     def nearest_walkable(self, start_rc, max_radius=80):
-        rows, cols = len(self.GRID), len(self.GRID[0])
+        rows, cols = self.GRID.rows, self.GRID.cols
+        free = self.GRID.free
         sr, sc = start_rc
 
-        if 0 <= sr < rows and 0 <= sc < cols and self.GRID[sr][sc]:
+        if self.GRID.is_free(sr, sc):
             return (sr, sc)
 
         # simple queue without deque
@@ -174,7 +193,7 @@ class GBFSDetourCar(AbstractCar):
 
             for nr, nc in ((r+1,c),(r-1,c),(r,c+1),(r,c-1)):
                 if 0 <= nr < rows and 0 <= nc < cols and (nr, nc) not in seen:
-                    if self.GRID[nr][nc]:
+                    if free[nr * cols + nc]:
                         return (nr, nc)
                     seen.add((nr, nc))
                     q.append((nr, nc, d+1))
@@ -189,21 +208,26 @@ class GBFSDetourCar(AbstractCar):
         y = gx * self.GRIDSIZE + self.GRIDSIZE / 2
         return x, y
     
-    def _clearance_at(self, x, y, radius=6, step=2):
-        width, height = self.TRACK_BORDER_MASK.get_size()
-        hits, samples = 0, 0
-        ix, iy = int(x), int(y)
-        for dx in range(-radius, radius+1, step):
-            for dy in range(-radius, radius+1, step):
-                sx, sy = ix + dx, iy + dy
-                if 0 <= sx < width and 0 <= sy < height:
-                    samples += 1
-                    if self.TRACK_BORDER_MASK.get_at((sx, sy)) != 0:
-                        hits += 1
-        return 0.0 if samples == 0 else (1.0 - hits / samples)
+    def cell_clearance(self):
+        """
+        Fraction of open border-mask samples around each grid cell centre, as
+        a flat list indexed ``row * cols + col``. Built once per track from
+        CLEARANCE (or the mask) instead of sampling the mask per node.
+        """
+        if self._cell_clearance is None:
+            if self.CLEARANCE is None:
+                self.CLEARANCE = clearance_map(mask_to_array(self.TRACK_BORDER_MASK), self.GRIDSIZE)
+            self._cell_clearance = self.CLEARANCE.ravel().tolist()
+        return self._cell_clearance
+
+    def _clearance_at(self, x, y):
+        """Clearance of the grid cell containing world point (x, y)."""
+        r, c = self.world_to_grid(x, y)
+        if not (0 <= r < self.GRID.rows and 0 <= c < self.GRID.cols):
+            return 0.0
+        return self.cell_clearance()[r * self.GRID.cols + c]
 
     def _neighbor_candidates(self, start_grid, goal_grid):
-        rows, cols = len(self.GRID), len(self.GRID[0])
         sx, sy = start_grid
         if self.allow_diag:
             neighs = [
@@ -215,7 +239,7 @@ class GBFSDetourCar(AbstractCar):
 
         scored = []
         for nr, nc in neighs:
-            if 0 <= nr < rows and 0 <= nc < cols and self.GRID[nr][nc]:
+            if self.GRID.is_free(nr, nc):
                 h = abs(nr - goal_grid[0]) + abs(nc - goal_grid[1])
                 wx, wy = self.grid_to_world(nr, nc)
                 clear = self._clearance_at(wx, wy)
@@ -327,46 +351,92 @@ class GBFSDetourCar(AbstractCar):
         super().move()
     
     def compute_path(self):
-        start = self.world_to_grid(self.x, self.y)
         goal_world = self.checkpoints[self.current_checkpoint]
+        if self.planner_service is not None:
+            pending = self._pending_plan
+            if pending is not None and pending[1] == "path" and pending[2] == goal_world:
+                return  # already on its way
+            self._submit_plan("path", self._plan_path, (self.x, self.y), goal_world)
+            if not self.path or self.current_point >= len(self.path):
+                # Head straight for the checkpoint until the plan arrives.
+                self.path = [goal_world]
+                self.current_point = 0
+            return
+
+        self.path = self._plan_path((self.x, self.y), goal_world)
+        # Start at beginning of new path, not using heading which is from previous checkpoint
+        self.current_point = 0
+
+    def _plan_path(self, start_world, goal_world):
+        """GBFS path (world points) to goal_world, else a smart detour, else []."""
+        start = self.world_to_grid(*start_world)
         goal = self.world_to_grid(*goal_world)
 
         # NEW: snap both to nearest free cell so GBFS has a chance
         start = self.nearest_walkable(start, max_radius=120)
         goal  = self.nearest_walkable(goal,  max_radius=120)
         
-        if not self.GRID[start[0]][start[1]] or not self.GRID[goal[0]][goal[1]]:
+        if not self.GRID.is_free(*start) or not self.GRID.is_free(*goal):
             print("Start/Goal blocked even after snapping:", start, goal)
 
+        key = ("gbfs", self.allow_diag, start, goal)
+        legs = leg_cache_for(self.GRID)
+        path = legs.get(key) if self.SMOOTH_PATHS else None
+        if path is not None:
+            return list(path)
+
         grid_path = self.greedy_best_first(
             start, goal,
             allow_diag=self.allow_diag
         )
-        
-        if grid_path is None:
-            pass
 
         if grid_path:
-            self.path = [self.grid_to_world(gx, gy) for gx, gy in grid_path]
-            # Start at beginning of new path, not using heading which is from previous checkpoint
+            if self.SMOOTH_PATHS:
+                path = [self.grid_to_world(gx, gy) for gx, gy in smooth_path(self.GRID, grid_path)]
+                legs.put(key, path)
+                return list(path)
+            return [self.grid_to_world(gx, gy) for gx, gy in grid_path]
+        return self.smart_detour(goal_world, start_world) or []
+
+    def _submit_plan(self, kind, fn, *args):
+        self.cell_clearance()  # build it here; the planner thread only reads it
+        future = self.planner_service.submit(self, fn, *args)
+        self._pending_plan = (future, kind, args[-1])
+
+    def _collect_plan(self):
+        """Apply the pending off-frame plan once it has arrived."""
+        future, kind, _ = self._pending_plan
+        if not future.done():
+            return
+        self._pending_plan = None
+        if future.cancelled():
+            return
+        result = future.result()
+        if kind == "path":
+            self.path = result
             self.current_point = 0
-        else:
-            detour = self.smart_detour(goal_world)
-            if detour:
-                self.path = detour
-                self.current_point = 0  # Start at beginning of detour path
+        elif kind == "detour":
+            if result:
+                self.path = result
+                self.current_point = self._next_ahead_index()
             else:
-                self.path = []
-                self.current_point = 0
-            
-    def smart_detour(self, goal_world):
+                self.compute_path()
+            self._frames_since_replan = 0
+        elif result:  # "unstick"
+            self.path = result
+            self.current_point = 0
+            self._stuck_frames = 0
+            self.vel = min(self.vel + self.acceleration, self.max_vel)
+
+    def smart_detour(self, goal_world, start_world=None):
         """
         GBFS-only smart detour:
         - pick a neighbor that is either closer or much clearer,
         - GBFS from that neighbor to the goal,
         - prepend a micro step to that neighbor in world space.
+        Starts from the car's position unless start_world is given.
         """
-        start_grid = self.world_to_grid(self.x, self.y)
+        start_grid = self.world_to_grid(*(start_world or (self.x, self.y)))
         goal_grid = self.world_to_grid(*goal_world)
 
         candidates = self._neighbor_candidates(start_grid, goal_grid)
@@ -389,6 +459,8 @@ class GBFSDetourCar(AbstractCar):
         return [self.grid_to_world(*best)]
 
     def move(self):
+        if self._pending_plan is not None:
+            self._collect_plan()
 
         # 1) Advance checkpoint if truly reached and ahead; replan but keep moving
         advanced = self._advance_checkpoint_if_reached()
@@ -424,11 +496,16 @@ class GBFSDetourCar(AbstractCar):
         while idx < len(self.path):
             tx, ty = self.path[idx]
             d = math.hypot(tx - lastx, ty - lasty)
+            if accum + d >= self.Lookahead_Dist:
+                if self.SMOOTH_PATHS and d > 0:
+                    # Waypoints are far apart: aim partway along the segment.
+                    f = (self.Lookahead_Dist - accum) / d
+                    px, py = lastx + (tx - lastx) * f, lasty + (ty - lasty) * f
+                else:
+                    px, py = tx, ty
+                break
             accum += d
             lastx, lasty = tx, ty
-            if accum >= self.Lookahead_Dist:
-                px, py = tx, ty
-                break
             idx += 1
         target_x, target_y = px, py
         self._dbg_target = (target_x, target_y)
@@ -460,15 +537,17 @@ class GBFSDetourCar(AbstractCar):
         predicted_y = self.y - vertical
         predicted_x = self.x - horizontal
 
-        
-        orig_rect = self.img.get_rect(topleft=(predicted_x, predicted_y))
-        rotated_img = pygame.transform.rotate(self.img, self.angle)
-        rotated_rect = rotated_img.get_rect(center=orig_rect.center)
-        car_mask = pygame.mask.from_surface(rotated_img)
 
         # Border collision predicted -> detour or replan (GBFS-only)
         # But skip collision check for a few frames after replanning to let car orient
-        if self._frames_since_replan > 5 and self.TRACK_BORDER_MASK.overlap(car_mask, (int(rotated_rect.left), int(rotated_rect.top))):
+        if self._frames_since_replan > 5 and pose_collides(
+                self.img, predicted_x, predicted_y, self.angle, self.TRACK_BORDER_MASK):
+            if self.planner_service is not None:
+                # Hold here until the detour (or any plan already on its way) arrives.
+                if self._pending_plan is None:
+                    self._submit_plan("detour", self.smart_detour,
+                                      self.checkpoints[self.current_checkpoint], (self.x, self.y))
+                return
             detour = self.smart_detour(self.checkpoints[self.current_checkpoint])
             if detour:
                 self.path = detour
@@ -490,7 +569,11 @@ class GBFSDetourCar(AbstractCar):
             self._stuck_frames = 0
         self._last_dist = d_to_lookahead
 
-        if self._stuck_frames >= self._stuck_threshold:
+        if self._stuck_frames >= self._stuck_threshold and self.planner_service is not None:
+            if self._pending_plan is None:
+                self._submit_plan("unstick", self.smart_detour,
+                                  self.checkpoints[self.current_checkpoint], (self.x, self.y))
+        elif self._stuck_frames >= self._stuck_threshold:
             detour = self.smart_detour(self.checkpoints[self.current_checkpoint])
             if detour:
                 self.path = detour
@@ -509,6 +592,11 @@ class GBFSDetourCar(AbstractCar):
         self.checkpoints = resources.GBFS_RACING_LINE[:] + [resources.FINISH_POSITION]
         self.GRID = resources.GRID
         self.TRACK_BORDER_MASK = resources.TRACK_BORDER_MASK
+        self.CLEARANCE = resources.TRACK_CLEARANCE
+        self._cell_clearance = None
+        if self.planner_service is not None:
+            self.planner_service.cancel(self)
+        self._pending_plan = None
 
         self.current_checkpoint = 0
         self.current_point = 0
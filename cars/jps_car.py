@@ -0,0 +1,21 @@
+from planning import jps_path
+from .dijkstra_car import DijkstraCar
+
+
+class JPSCar(DijkstraCar):
+    """
+    DijkstraCar that plans every checkpoint leg with Jump Point Search.
+    Path following and checkpoint handling are DijkstraCar's.
+    """
+    def __init__(self, *args, **kwargs):
+        kwargs["planner"] = "jps"
+        super().__init__(*args, **kwargs)
+
+    def _jps_path(self, start_world, goal_world, stats=None):
+        """Same as _dijkstra_path, searched with Jump Point Search instead."""
+        cells = jps_path(self.GRID, self._world_to_grid(*start_world),
+                         self._world_to_grid(*goal_world), stats)
+        return [self._grid_to_world(gx, gy) for gx, gy in cells]
+
+    def _search(self, start_world, goal_world, stats=None):
+        return self._jps_path(start_world, goal_world, stats)
@@ -1,10 +1,22 @@
 import math
+import numpy as np
 import pygame
+from car_batch import BatchedCar
 from resources import raycast_mask, CHECKPOINT_RADIUS
 from .abstract_car import AbstractCar
 
 
-class NEATCar(AbstractCar):
+def _car_columns(cars, *names):
+    """Per-car attribute arrays, sliced straight out of the cars' CarBatch when they share one."""
+    batch = cars[0]._batch if cars else None
+    if batch is not None and all(car._batch is batch for car in cars):
+        rows = batch.rows(cars)
+        return [batch.columns[name][rows] for name in names]
+    return [np.fromiter((getattr(car, name) for car in cars), dtype=float, count=len(cars))
+            for name in names]
+
+
+class NEATCar(BatchedCar, AbstractCar):
     """
     NEAT-controlled car that uses raycasting sensors to navigate a track.
     """
@@ -44,25 +56,31 @@ class NEATCar(AbstractCar):
         self.brake_factor = TuningData[3] # Braking
 
     # ---------- geometry ----------
-    def _basis_vectors(self):
+    def _basis_vectors(self, angle=None):
         """
         Forward & left unit vectors consistent with AbstractCar.move():
         angle=0° points up; forward = (-sinθ, -cosθ), left = (-cosθ, +sinθ)
+        ``angle`` defaults to the car's.
         """
-        r = math.radians(self.angle)
+        r = math.radians(self.angle if angle is None else angle)
         fwd  = (-math.sin(r), -math.cos(r))
         left = (-math.cos(r),  math.sin(r))
         return fwd, left
 
-    def _anchors(self, inset_front=2.0, inset_side=2.0):
+    def _anchors(self, inset_front=2.0, inset_side=2.0, pose=None):
         """
         Distinct origins for the 5 sensors, computed from the sprite **center** (self.x, self.y):
           0 front nose, 1 front-left corner, 2 front-right corner,
           3 side-left midpoint, 4 side-right midpoint
+        ``pose`` is an (x, y, angle) to use instead of the car's, e.g. render_pose().
         """
-        cx, cy = self.get_centre()
         w, h = self.img.get_size()
-        fwd, left = self._basis_vectors()
+        if pose is None:
+            cx, cy = self.get_centre()
+            fwd, left = self._basis_vectors()
+        else:
+            cx, cy = pose[0] + w/2, pose[1] + h/2
+            fwd, left = self._basis_vectors(pose[2])
         right = (-left[0], -left[1])
 
         half_len = h/2 - inset_front
@@ -88,23 +106,24 @@ class NEATCar(AbstractCar):
             side_right          # 4
         ]
 
-    def _dir_rel(self, rel_rad):
+    def _dir_rel(self, rel_rad, angle=None):
         """dir = forward*cos(a) + left*sin(a)  (relative to forward)."""
-        fwd, left = self._basis_vectors()
+        fwd, left = self._basis_vectors(angle)
         ca, sa = math.cos(rel_rad), math.sin(rel_rad)
         return (fwd[0]*ca + left[0]*sa, fwd[1]*ca + left[1]*sa)
 
-    def _fixed_dirs(self):
+    def _fixed_dirs(self, angle=None):
         """
         Direction vectors for the 5 sensors:
           front, slight-left (+30°), slight-right (-30°), side-left (90°), side-right (-90°).
+        ``angle`` defaults to the car's.
         """
-        fwd, left = self._basis_vectors()
+        fwd, left = self._basis_vectors(angle)
         right = (-left[0], -left[1])
         return [
             fwd,                         # front
-            self._dir_rel(+self._rel_slight),  # slight-left
-            self._dir_rel(-self._rel_slight),  # slight-right
+            self._dir_rel(+self._rel_slight, angle),  # slight-left
+            self._dir_rel(-self._rel_slight, angle),  # slight-right
             left,                        # side-left
             right                        # side-right
         ]
@@ -133,11 +152,93 @@ class NEATCar(AbstractCar):
                         origin[1] + d[1]*self.sensor_length)
             rays.append((origin, end))
 
+        return self._store_readings(distances, rays)
+
+    def set_sensor_readings(self, origins, dirs, distances, hits):
+        """
+        Feed in ray results computed elsewhere (see NEATManager batch sensing).
+        ``origins``/``dirs`` are this car's 5 rays as from sensor_rays_batch().
+        """
+        distances = np.minimum(distances, self.sensor_length)
+        rays = []
+        for origin, d, dist, hit in zip(origins, dirs, distances, hits):
+            reach = dist if hit else self.sensor_length
+            rays.append(((origin[0], origin[1]),
+                         (origin[0] + d[0]*reach, origin[1] + d[1]*reach)))
+        return self._store_readings((distances / float(self.sensor_length)).tolist(), rays)
+
+    @staticmethod
+    def set_sensor_readings_batch(cars, origins, dirs, distances, hits):
+        """
+        set_sensor_readings() for many cars at once; arrays are shaped as
+        from sensor_rays_batch(), distances/hits (len(cars), 5). Returns the
+        cars' inputs as one (len(cars), 6) array.
+        """
+        lengths = np.fromiter((car.sensor_length for car in cars), dtype=float, count=len(cars))[:, None]
+        distances = np.minimum(distances, lengths)
+        reach = np.where(hits, distances, lengths)
+        rays = np.stack((origins, origins + dirs * reach[..., None]), axis=2)  # (n, 5, [origin, end], 2)
+
+        vel, max_vel = _car_columns(cars, "vel", "max_vel")
+        speed_norm = np.divide(vel, max_vel, out=np.zeros(len(cars)), where=max_vel > 0.0)
+        inputs = np.concatenate((distances / lengths, speed_norm[:, None]), axis=1)
+        for car, car_inputs, car_rays in zip(cars, inputs.tolist(), rays):
+            car.inputs = car_inputs
+            car._sensor_cache = car_rays
+        return inputs
+
+    def _store_readings(self, distances, rays):
         speed_norm = self.vel / self.max_vel if self.max_vel > 0.0 else 0.0
         self.inputs = distances + [speed_norm]
         self._sensor_cache = rays
         return self.inputs
 
+    @staticmethod
+    def sensor_rays_batch(cars, inset_front=2.0, inset_side=2.0):
+        """
+        Vectorised _anchors() and _fixed_dirs() for many cars.
+
+        Returns ``(origins, dirs)`` shaped (len(cars), 5, 2), with the sensors
+        in the same order as sense().
+        """
+        n = len(cars)
+        ws = np.empty(n); hs = np.empty(n); slight = np.empty(n)
+        for i, car in enumerate(cars):
+            ws[i], hs[i] = car.img.get_size()
+            slight[i] = car._rel_slight
+
+        xs, ys, angles = _car_columns(cars, "x", "y", "angle")
+
+        r = np.radians(angles)
+        sin_r, cos_r = np.sin(r), np.cos(r)
+        fwd = np.stack((-sin_r, -cos_r), axis=1)
+        left = np.stack((-cos_r, sin_r), axis=1)
+        right = -left
+        centre = np.stack((xs + ws / 2, ys + hs / 2), axis=1)
+
+        half_len = (hs / 2 - inset_front)[:, None]
+        half_wid = (ws / 2 - inset_side)[:, None]
+        corner_fwd = fwd * half_len * 0.9
+        corner_lat = half_wid * 0.9
+
+        origins = np.stack((
+            centre + fwd * half_len,                    # front nose
+            centre + corner_fwd + left * corner_lat,    # front-left corner
+            centre + corner_fwd + right * corner_lat,   # front-right corner
+            centre + left * half_wid,                   # side-left
+            centre + right * half_wid,                  # side-right
+        ), axis=1)
+
+        ca, sa = np.cos(slight)[:, None], np.sin(slight)[:, None]
+        dirs = np.stack((
+            fwd,
+            fwd * ca + left * sa,
+            fwd * ca - left * sa,
+            left,
+            right,
+        ), axis=1)
+        return origins, dirs
+
     # ---------- NEAT ----------
     def set_net(self, net):
         self.net = net
@@ -163,8 +264,30 @@ class NEATCar(AbstractCar):
         elif throttle <= -0.2:
             self.vel = max(self.vel - self.acceleration, -self.max_vel / 2)
 
+    @staticmethod
+    def apply_controls_batch(batch, rows, outputs):
+        """
+        apply_controls() for the cars in ``rows`` of a CarBatch at once.
+        ``outputs`` is their [steer, throttle] pairs, shaped (len(rows), 2).
+        """
+        outputs = np.asarray(outputs, dtype=float).reshape(-1, 2)
+        steer, throttle = outputs[:, 0], outputs[:, 1]
+        c = batch.columns
+
+        turn = c["rotation_vel"][rows]
+        c["angle"][rows] += np.where(steer > 0.1, turn, np.where(steer < -0.1, -turn, 0.0))
+
+        vel, acc, max_vel = c["vel"][rows], c["acceleration"][rows], c["max_vel"][rows]
+        vel = np.where(throttle >= 0.6, np.minimum(vel + acc, max_vel), vel)
+        vel = np.where(throttle <= -0.2, np.maximum(vel - acc, -max_vel / 2), vel)
+        c["vel"][rows] = vel
+
     def move(self):
         self.sense(self.track_mask, raycast_mask)
+        self.drive()
+
+    def drive(self):
+        """think -> apply_controls -> move, using the inputs from the last sense."""
         self.think()
         self.apply_controls()
         super().move()
@@ -194,20 +317,24 @@ class NEATCar(AbstractCar):
     def draw(self, win, draw_sensors: bool = True):
         super().draw(win)
 
-        for pt in self._anchors():
+        # Anchors and rays follow the interpolated pose the sprite is drawn at.
+        pose = self.render_pose()
+        anchors = self._anchors(pose=pose)
+        for pt in anchors:
             pygame.draw.circle(win, (255, 165, 0), (int(pt[0]), int(pt[1])), 3)
 
         # draw sensors only when requested
         if draw_sensors:
-            self._draw_sensors(win)
+            self._draw_sensors(win, anchors, self._fixed_dirs(pose[2]))
 
-    def _draw_sensors(self, win):
-        # Rays (from last sense())
-        if self._sensor_cache:
-            for origin, end in self._sensor_cache:
+    def _draw_sensors(self, win, anchors, dirs):
+        # Rays (lengths from last sense()), laid out from the drawn anchors
+        if self._sensor_cache is not None:
+            for (origin, end), start, d in zip(self._sensor_cache, anchors, dirs):
+                reach = math.hypot(end[0] - origin[0], end[1] - origin[1])
                 pygame.draw.line(win, (0, 255, 0),
-                                 (int(origin[0]), int(origin[1])),
-                                 (int(end[0]),    int(end[1])), 2)
+                                 (int(start[0]), int(start[1])),
+                                 (int(start[0] + d[0]*reach), int(start[1] + d[1]*reach)), 2)
 
     def set_level(self, level):
         import resources
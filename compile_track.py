@@ -0,0 +1,133 @@
+"""
+Offline track compiler.
+
+Turns each level's border PNG and racing lines into one binary package that
+the game memory-maps at load time instead of rebuilding the grid and distance
+field itself:
+
+    python compile_track.py            # all levels
+    python compile_track.py 2 3        # just levels 2 and 3
+    python compile_track.py --out DIR  # somewhere other than assets/compiled
+
+Package sections (see track_package.py for the file layout):
+
+- ``grid_bits``          occupancy grid, 1 = free, bit-packed along each row
+- ``distance_field``     float32 pixel distance to the nearest wall (capped)
+- ``clearance``          float32 fraction of open samples around each cell
+- ``line/<name>``        float32 (N, 3) rows of x, y, cumulative arc length
+- ``paths/<name>/cells`` int16 (M, 2) grid cells of every checkpoint leg
+- ``paths/<name>/offsets`` int32 (legs + 1) start of each leg in ``cells``
+- ``flow/goals``         int16 (K, 2) checkpoint cells with a flow field
+- ``flow/fields``        float32 (K, rows, cols) cost-to-goal in cells, inf if unreachable
+"""
+
+import argparse
+import os
+import time
+
+# The compiler never draws; keep resources from opening a window.
+os.environ.setdefault("DFA_HEADLESS", "1")
+
+import numpy as np
+import pygame
+
+import resources
+from planning import cost_to_goal, dijkstra_path, nearest_free
+from track_fields import DISTANCE_FIELD_CAP, OccupancyGrid, clearance_map, distance_field, mask_to_array
+from track_package import file_digest, write_track_package
+
+
+def arc_length_line(points):
+    """(N, 3) float32 array of x, y and distance travelled along ``points``."""
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    seg = np.hypot(*np.diff(pts, axis=0).T) if len(pts) > 1 else np.zeros(0)
+    s = np.concatenate(([0.0], np.cumsum(seg)))
+    return np.column_stack((pts, s)).astype(np.float32)
+
+
+def checkpoint_legs(grid, checkpoints, cell_size):
+    """Shortest grid path for every leg i -> i+1 (wrapping), as cells + offsets."""
+    cells = []
+    offsets = [0]
+    memo = {}
+    for i, start in enumerate(checkpoints):
+        goal = checkpoints[(i + 1) % len(checkpoints)]
+        a = nearest_free(grid, (int(start[1] // cell_size), int(start[0] // cell_size)))
+        b = nearest_free(grid, (int(goal[1] // cell_size), int(goal[0] // cell_size)))
+        key = (a, b)
+        if key not in memo:
+            memo[key] = dijkstra_path(grid, a, b) if a and b else []
+        cells.extend(memo[key])
+        offsets.append(len(cells))
+    return (np.asarray(cells, dtype=np.int16).reshape(-1, 2),
+            np.asarray(offsets, dtype=np.int32))
+
+
+def compile_level(level, out_dir):
+    definition = resources.LEVEL_DEFINITIONS[level]
+    border_path = definition["border"]
+    mask = pygame.mask.from_surface(pygame.image.load(border_path))
+    walls = mask_to_array(mask)
+    cell_size = resources.GRID_SIZE
+
+    grid = OccupancyGrid(~walls[::cell_size, ::cell_size], cell_size)
+    arrays = {
+        "grid_bits": np.packbits(grid.array, axis=1),
+        "distance_field": distance_field(walls, DISTANCE_FIELD_CAP),
+        "clearance": clearance_map(walls, cell_size),
+    }
+
+    # Every racing line the level defines, as the cars drive it: the line
+    # followed by the finish position.
+    lines = [key for key in definition if key.endswith("racing_line")]
+    for name in lines:
+        checkpoints = list(definition[name]) + [definition["finish_position"]]
+        arrays[f"line/{name}"] = arc_length_line(checkpoints)
+        cells, offsets = checkpoint_legs(grid, checkpoints, cell_size)
+        arrays[f"paths/{name}/cells"] = cells
+        arrays[f"paths/{name}/offsets"] = offsets
+
+    # Flow fields for every checkpoint cell, keyed the way DijkstraCar maps
+    # world positions to cells.
+    goals = list(dict.fromkeys(
+        (int(y // cell_size), int(x // cell_size))
+        for name in lines
+        for x, y in list(definition[name]) + [definition["finish_position"]]
+    ))
+    arrays["flow/goals"] = np.asarray(goals, dtype=np.int16).reshape(-1, 2)
+    arrays["flow/fields"] = np.stack([cost_to_goal(grid, g) for g in goals])
+
+    meta = {
+        "level": level,
+        "border": border_path,
+        "border_sha1": file_digest(border_path),
+        "size": list(mask.get_size()),
+        "grid_size": cell_size,
+        "grid_shape": [grid.rows, grid.cols],
+        "distance_cap": DISTANCE_FIELD_CAP,
+        "racing_lines": lines,
+    }
+
+    path = resources.track_package_path(level, out_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_track_package(path, meta, arrays)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile level tracks into binary packages.")
+    parser.add_argument("levels", nargs="*", type=int,
+                        help="levels to compile (default: all)")
+    parser.add_argument("--out", default=resources.TRACK_PACKAGE_DIR,
+                        help="output directory (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    for level in args.levels or sorted(resources.LEVEL_DEFINITIONS):
+        t0 = time.perf_counter()
+        path = compile_level(level, args.out)
+        size_kb = os.path.getsize(path) / 1024
+        print(f"Level {level}: {path} ({size_kb:.0f} KiB, {time.perf_counter() - t0:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 # main.py
+import time
+
+_START_TIME = time.perf_counter()  # for the time-to-first-menu-frame report
+
 import asyncio
 import pygame
 import neat
 import ui
 import math
-import time
 import pickle
 from neatmanager import NEATManager
+from planner_service import PlannerService
 import resources
 import sys
 import random
@@ -15,7 +19,7 @@ from resources import (
     GameInfo, WIN, FPS, images,
     create_player_car, create_computer_car, create_GBFS_car,
     create_neat_car, blit_text_center, raycast_mask,
-    load_track_for_level, create_dijkstra_car, MENU3,
+    load_track_for_level, create_dijkstra_car, create_astar_car, create_jps_car,
     apply_level_speed_tuning
 )
 
@@ -48,16 +52,41 @@ config = neat.Config(
     "neat_config.ini"
 )
 
-manager = NEATManager(
-    neat_config=config,
-    car_factory=create_neat_car,
-    track_mask=resources.TRACK_BORDER_MASK,
-    raycast_fn=raycast_mask,
-    fps=FPS,
-    time_limit_sec=50
-)
+manager = None  # built on first use; see get_manager()
+
+
+def get_manager():
+    """Create the NEAT training manager the first time training is needed."""
+    global manager
+    if manager is None:
+        manager = NEATManager(
+            neat_config=config,
+            car_factory=create_neat_car,
+            track_mask=resources.TRACK_BORDER_MASK,
+            raycast_fn=raycast_mask,
+            fps=FPS,
+            time_limit_sec=50,
+            clock=resources.SIM_CLOCK
+        )
+    return manager
+
+
+planner_service = None  # built on first race; see get_planner_service()
+
+
+def get_planner_service():
+    """The PlannerService the race cars plan through, created on first use."""
+    global planner_service
+    if planner_service is None:
+        planner_service = PlannerService()
+    return planner_service
 
 TRAIN_GENERATIONS = 10
+TRAIN_SPEED = 8  # NEAT training runs this many times faster than real time...
+TRAIN_MAX_STEPS = 16  # ...but never more sim steps than this per frame
+PRELOAD_BUDGET_SEC = 0.004  # per-frame time spent warming lazy assets in the menus
+FLOW_FIELD_BUDGET_SEC = 0.008  # per-frame time spent building flow fields during the countdown
+PLANNER_BUDGET_SEC = 0.004  # per-frame time for path searches (on the planner thread or here)
 
 
 def _font(size):
@@ -74,7 +103,9 @@ def create_car_by_model(model_type, color="Red"):
     elif model_type == "GBFS":
         return create_GBFS_car(color)
     elif model_type == "AStar":
-        return create_dijkstra_car(color=color)
+        return create_astar_car(color=color)
+    elif model_type == "JPS":
+        return create_jps_car(color=color)
     elif model_type == "Dijkstra":
         return create_dijkstra_car(color=color)
     elif model_type == "NEAT":
@@ -86,7 +117,7 @@ def load_trained_network(config):
     try:
         with open("assets/winner_genome.pkl", "rb") as f:
             winner = pickle.load(f)
-        return neat.nn.FeedForwardNetwork.create(winner, config)
+        return neat.nn.CompiledFeedForwardNetwork.create(winner, config)
     except FileNotFoundError:
         return None
 
@@ -118,6 +149,7 @@ async def main():
     running = True
 
     plotted_points = []
+    first_frame = True
 
     menu = ui.Menu()
     menu.drawMain(WIN)
@@ -209,6 +241,7 @@ async def main():
 
                     # NEAT Chosen → enter LIVE TRAINING immediately
                     if chosen_model == "NEAT" and game_info.get_level() in (1, 2, 3, 4):
+                        manager = get_manager()
                         manager.track_mask = resources.TRACK_BORDER_MASK
                         manager.reset()
                         game_state = STATE_NEAT_LIVE_TRAINING
@@ -271,6 +304,11 @@ async def main():
                     _place(neat_car, "neat")
                     _place(dijkstra_car, "dijkstra")
 
+                    # Replans from here on run off the frame.
+                    for car in (player_car, GBFS_car, dijkstra_car):
+                        if hasattr(car, "planner_service"):
+                            car.planner_service = get_planner_service()
+
                     trained_net = load_trained_network(config)
                     if trained_net:
                         neat_car.net = trained_net
@@ -302,13 +340,24 @@ async def main():
         elif game_state == STATE_PAGE2:
             menu.drawPage2(WIN)
 
+        # Warm the remaining lazy assets while the menus are up.
+        if game_state in (STATE_MENU, STATE_LEVEL_SELECT, STATE_PAGE1, STATE_PAGE2):
+            resources.preload_assets(PRELOAD_BUDGET_SEC)
+
         # -----------------------------------
         # COUNTDOWN
         # -----------------------------------
         if game_state == STATE_COUNTDOWN:
 
             countdown_timer -= dt
-            WIN.blit(MENU3, (0, 0))
+            WIN.blit(resources.MENU3, (0, 0))
+
+            # Build the Dijkstra cars' checkpoint flow fields before the start,
+            # on the planner within its per-frame budget.
+            for car in (player_car, dijkstra_car):
+                if hasattr(car, "warm_flow_fields"):
+                    car.warm_flow_fields(FLOW_FIELD_BUDGET_SEC)
+            get_planner_service().pump(FLOW_FIELD_BUDGET_SEC)
 
             blit_text_center(WIN, _font(48),
                              str(max(1, math.ceil(countdown_timer))))
@@ -316,16 +365,20 @@ async def main():
             if countdown_timer <= 0:
                 game_info.start_level()
                 post_countdown_delay = 0.1
+                resources.SIM_CLOCK.reset()
+                for car in (player_car, computer_car, GBFS_car, neat_car, dijkstra_car):
+                    car.save_pose()
                 game_state = STATE_RACING
 
         # -----------------------------------
         # Press SPACE to stop training at any time
         # -----------------------------------
         elif game_state == STATE_NEAT_LIVE_TRAINING:
+            manager = get_manager()
 
             # Run NEAT faster
-            for _ in range(8):
-                manager.update(dt)
+            for _ in range(resources.SIM_CLOCK.advance(dt, TRAIN_SPEED, TRAIN_MAX_STEPS)):
+                manager.update()
 
             # Draw NEAT population
             WIN.fill((20, 20, 20))
@@ -342,7 +395,7 @@ async def main():
             if keys[pygame.K_SPACE]:
 
                 if manager.winner:
-                    trained_net = neat.nn.FeedForwardNetwork.create(
+                    trained_net = neat.nn.CompiledFeedForwardNetwork.create(
                         manager.winner, config
                     )
                     player_car.set_net(trained_net)
@@ -354,6 +407,51 @@ async def main():
         # REGULAR RACING
         # -----------------------------------
         elif game_state == STATE_RACING:
+            # Frame time for the path searches queued by the cars
+            get_planner_service().pump(PLANNER_BUDGET_SEC)
+
+            # Fixed sim steps for the real time that has passed
+            for _ in range(resources.SIM_CLOCK.advance(dt)):
+                for car in (player_car, computer_car, GBFS_car, neat_car, dijkstra_car):
+                    car.save_pose()
+
+                if post_countdown_delay > 0:
+                    post_countdown_delay = max(0.0, post_countdown_delay - resources.SIM_CLOCK.dt)
+
+                # AI logic
+                if post_countdown_delay <= 0:
+                    neat_car.move()
+                    neat_car.sense(neat_car.track_mask, raycast_mask)
+                    neat_car.think()
+                    neat_car.apply_controls()
+
+                # Player car movement (manual or autonomous)
+                if post_countdown_delay <= 0:
+                    # Use getattr to safely check autonomous attribute (some cars don't have it)
+                    # AI cars default to autonomous=True, only PlayerCar can be manual
+                    if getattr(player_car, 'autonomous', True):
+                        player_car.move()  # Autonomous mode: follow path
+                    else:
+                        ui.move_player(player_car)  # Manual mode: keyboard control
+
+                # Other AI cars (no delays for opponent cars)
+                if post_countdown_delay <= 0:
+                    computer_car.move()
+                    GBFS_car.move()
+                    dijkstra_car.move()
+
+                winner = ui.handle_collision(
+                    player_car, computer_car, GBFS_car,
+                    neat_car, dijkstra_car, chosen_model, level=game_info.get_level()
+                )
+
+                if winner:
+                    level_time = game_info.get_level_time()
+                    level_result = "win" if winner == "Player" else "lose"
+                    game_state = STATE_LEVEL_END
+                    break
+
+            # Drawn between the last two sim steps (see AbstractCar.render_pose)
             ui.draw(
                 WIN,
                 images,
@@ -378,51 +476,17 @@ async def main():
                     (10, 10),
                 )
 
-            if post_countdown_delay > 0:
-                post_countdown_delay = max(0.0, post_countdown_delay - dt)
-
-            # AI logic
-            if post_countdown_delay <= 0:
-                neat_car.move()
-                neat_car.sense(neat_car.track_mask, raycast_mask)
-                neat_car.think()
-                neat_car.apply_controls()
-
-            # Player car movement (manual or autonomous)
-            if post_countdown_delay <= 0:
-                # Use getattr to safely check autonomous attribute (some cars don't have it)
-                # AI cars default to autonomous=True, only PlayerCar can be manual
-                if getattr(player_car, 'autonomous', True):
-                    player_car.move()  # Autonomous mode: follow path
-                else:
-                    ui.move_player(player_car)  # Manual mode: keyboard control
-            
-            # Other AI cars (no delays for opponent cars)
-            if post_countdown_delay <= 0:
-                computer_car.move()
-                GBFS_car.move()
-                dijkstra_car.move()
-
-            winner = ui.handle_collision(
-                player_car, computer_car, GBFS_car,
-                neat_car, dijkstra_car, chosen_model, level=game_info.get_level()
-            )
-
-            if winner:
-                level_time = time.time() - game_info.level_start_time
-                level_result = "win" if winner == "Player" else "lose"
-                game_state = STATE_LEVEL_END
-
         # -----------------------------------
         # ORIGINAL TRAINING (unchanged)
         # -----------------------------------
         elif game_state == STATE_TRAINING:
-            for _ in range(8):
-                gen, finished, total = manager.update(dt)
+            manager = get_manager()
+            for _ in range(resources.SIM_CLOCK.advance(dt, TRAIN_SPEED, TRAIN_MAX_STEPS)):
+                gen, finished, total = manager.update()
 
                 if gen >= TRAIN_GENERATIONS:
                     if manager.winner:
-                        trained_net = neat.nn.FeedForwardNetwork.create(
+                        trained_net = neat.nn.CompiledFeedForwardNetwork.create(
                             manager.winner, config
                         )
                     game_state = STATE_MENU
@@ -445,6 +509,9 @@ async def main():
             )
 
         pygame.display.flip()
+        if first_frame:
+            first_frame = False
+            print(f"First menu frame after {(time.perf_counter() - _START_TIME) * 1000:.0f} ms")
         await asyncio.sleep(0)
 
     if resources.DEBUG_DRAW_POINTS and plotted_points:
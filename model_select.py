@@ -16,7 +16,7 @@ import resources
 # Configuration
 # ---------------------------------------------------------------------
 
-MODELS = ["Player", "BFS", "DFS", "GBFS", "AStar", "NEAT"]
+MODELS = ["Player", "BFS", "DFS", "GBFS", "AStar", "JPS", "NEAT"]
 COLORS = ["Red", "Blue", "Green", "Purple", "White", "Grey", "Pink", "Yellow"]
 BLUE = (0, 120, 215)
 
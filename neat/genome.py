@@ -1,6 +1,7 @@
 """Handles genomes (individuals in the population)."""
 import copy
 import sys
+from collections import defaultdict
 from itertools import count
 from random import choice, random, shuffle
 
@@ -8,7 +9,7 @@ from neat.activations import ActivationFunctionSet
 from neat.aggregations import AggregationFunctionSet
 from neat.config import ConfigParameter, write_pretty_params
 from neat.genes import DefaultConnectionGene, DefaultNodeGene
-from neat.graphs import creates_cycle
+from neat.graphs import path_exists
 from neat.graphs import required_for_output
 
 
@@ -204,6 +205,61 @@ class DefaultGenome:
         # Fitness results.
         self.fitness = None
 
+        # Successor sets over the connection keys, for cycle checks (see connection_index).
+        self._successors = None
+        self._indexed_connections = 0
+
+    def __getstate__(self):
+        # The connection index is rebuilt on demand; keep it out of checkpoints.
+        state = self.__dict__.copy()
+        state.pop('_successors', None)
+        state.pop('_indexed_connections', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._successors = None
+        self._indexed_connections = 0
+
+    def connection_index(self):
+        """
+        Returns a mapping from each node to the set of nodes it connects to,
+        over all connection genes (enabled or not). Built on first use, then
+        kept up to date by this genome's own structural mutations and
+        crossover; it is rebuilt if the number of connections no longer
+        matches, e.g. after genes were added or removed directly.
+        """
+        successors = self._successors
+        if successors is None or self._indexed_connections != len(self.connections):
+            successors = defaultdict(set)
+            for a, b in self.connections:
+                successors[a].add(b)
+            self._successors = successors
+            self._indexed_connections = len(self.connections)
+        return successors
+
+    def _index_connection(self, key):
+        """Record a connection key just added to self.connections in the index, if there is one."""
+        successors = self._successors
+        if successors is not None and key[1] not in successors[key[0]]:
+            successors[key[0]].add(key[1])
+            self._indexed_connections += 1
+
+    def _unindex_connection(self, key):
+        """Drop a connection key just deleted from self.connections from the index, if there is one."""
+        successors = self._successors
+        if successors is not None and key[1] in successors.get(key[0], ()):
+            successors[key[0]].discard(key[1])
+            self._indexed_connections -= 1
+
+    def creates_cycle(self, key):
+        """
+        Returns true if adding connection 'key' would create a cycle. Costs a
+        depth-first search of the nodes reachable from its output end.
+        """
+        i, o = key
+        return i == o or path_exists(self.connection_index(), o, i)
+
     def configure_new(self, config):
         """Configure a new genome based on the given configuration."""
 
@@ -303,22 +359,25 @@ class DefaultGenome:
                     # Take the gene from the fitter parent
                     new_gene = cg1.copy()
                     # For feed-forward networks, check if this connection would create a cycle
-                    if config.feed_forward and creates_cycle(list(self.connections), new_gene.key):
+                    if config.feed_forward and self.creates_cycle(new_gene.key):
                         continue
                     self.connections[new_gene.key] = new_gene
+                    self._index_connection(new_gene.key)
                 else:
                     new_gene = cg1.crossover(cg2)
                     # For feed-forward networks, check if this connection would create a cycle
-                    if config.feed_forward and creates_cycle(list(self.connections), new_gene.key):
+                    if config.feed_forward and self.creates_cycle(new_gene.key):
                         continue
                     self.connections[new_gene.key] = new_gene
+                    self._index_connection(new_gene.key)
             elif cg1 is not None:
                 # Disjoint or excess gene from fittest parent (parent1)
                 new_gene = cg1.copy()
                 # For feed-forward networks, check if this connection would create a cycle
-                if config.feed_forward and creates_cycle(list(self.connections), new_gene.key):
+                if config.feed_forward and self.creates_cycle(new_gene.key):
                     continue
                 self.connections[new_gene.key] = new_gene
+                self._index_connection(new_gene.key)
             # Note: genes only in parent2 (less fit) are not inherited
 
         # Inherit node genes
@@ -447,6 +506,7 @@ class DefaultGenome:
         connection.weight = weight
         connection.enabled = enabled
         self.connections[key] = connection
+        self._index_connection(key)
 
     def mutate_add_connection(self, config):
         """
@@ -484,7 +544,7 @@ class DefaultGenome:
         # they cannot be the output end of a connection (see above).
 
         # For feed-forward networks, avoid creating cycles.
-        if config.feed_forward and creates_cycle(list(self.connections), key):
+        if config.feed_forward and self.creates_cycle(key):
             return
 
         # Get innovation number for this connection
@@ -494,6 +554,7 @@ class DefaultGenome:
         )
         cg = self.create_connection(config, in_node, out_node, innovation)
         self.connections[cg.key] = cg
+        self._index_connection(cg.key)
 
     def mutate_delete_node(self, config):
         # Do nothing if there are no non-output nodes.
@@ -510,6 +571,7 @@ class DefaultGenome:
 
         for key in connections_to_delete:
             del self.connections[key]
+            self._unindex_connection(key)
 
         del self.nodes[del_key]
 
@@ -519,6 +581,7 @@ class DefaultGenome:
         if self.connections:
             key = choice(list(self.connections.keys()))
             del self.connections[key]
+            self._unindex_connection(key)
 
     def distance(self, other, config):
         """
@@ -10,19 +10,36 @@ def creates_cycle(connections, test):
     if i == o:
         return True
 
-    visited = {o}
-    while True:
-        num_added = 0
-        for a, b in connections:
-            if a in visited and b not in visited:
-                if b == i:
-                    return True
+    successors, _ = _adjacency(connections)
+    return path_exists(successors, o, i)
+
 
+def path_exists(successors, start, target):
+    """
+    Returns true if 'target' can be reached from 'start' by following connections.
+    :param successors: mapping from each node to the nodes it connects to.
+    Visits only the nodes reachable from 'start' (depth-first), each once.
+    """
+    visited = {start}
+    stack = [start]
+    while stack:
+        for b in successors.get(stack.pop(), ()):
+            if b == target:
+                return True
+            if b not in visited:
                 visited.add(b)
-                num_added += 1
+                stack.append(b)
+    return False
 
-        if num_added == 0:
-            return False
+
+def _adjacency(connections):
+    """Successor and predecessor lists of every node in 'connections'."""
+    successors = defaultdict(list)
+    predecessors = defaultdict(list)
+    for a, b in connections:
+        successors[a].append(b)
+        predecessors[b].append(a)
+    return successors, predecessors
 
 
 def required_for_output(inputs, outputs, connections):
@@ -37,26 +54,34 @@ def required_for_output(inputs, outputs, connections):
     Returns a set of identifiers of required nodes.
     """
     assert not set(inputs).intersection(outputs)
+    _, predecessors = _adjacency(connections)
+    return _required(set(inputs), outputs, predecessors)
 
-    # Traverse backwards from outputs to find all nodes that feed into outputs.
-    # This includes orphaned nodes (nodes with no incoming connections) that
-    # connect to outputs, as they are required to compute the output.
-    required = set(outputs)
-    s = set(outputs)
-    while True:
-        # Find nodes not in s whose output is consumed by a node in s
-        t = {a for (a, b) in connections if b in s and a not in s}
 
-        if not t:
-            break
+def _required(inputs, outputs, predecessors):
+    # Traverse backwards from outputs to find all nodes that feed into outputs,
+    # one frontier at a time, each connection looked at once. This includes
+    # orphaned nodes (nodes with no incoming connections) that connect to
+    # outputs, as they are required to compute the output. A frontier that
+    # reaches only input nodes ends the search.
+    required = set(outputs)
+    seen = set(outputs)
+    frontier = list(seen)
+    while frontier:
+        t = set()
+        for b in frontier:
+            for a in predecessors.get(b, ()):
+                if a not in seen:
+                    t.add(a)
 
         # Only add non-input nodes to the required set
         layer_nodes = {x for x in t if x not in inputs}
         if not layer_nodes:
             break
 
-        required = required.union(layer_nodes)
-        s = s.union(t)
+        required |= layer_nodes
+        seen |= t
+        frontier = t
 
     return required
 
@@ -71,43 +96,40 @@ def feed_forward_layers(inputs, outputs, connections):
     Note that the returned layers do not contain nodes whose output is ultimately
     never used to compute the final network output.
     """
+    successors, predecessors = _adjacency(connections)
+    required = _required(set(inputs), outputs, predecessors)
 
-    required = required_for_output(inputs, outputs, connections)
+    # Bias neurons are required nodes with no incoming connections; they
+    # output activation(bias) independent of inputs.
+    bias_neurons = {n for n in required if n not in predecessors}
 
-    # Find required nodes that have no incoming connections.
-    # These are "bias neurons" that output activation(bias) independent of inputs.
-    nodes_with_inputs = set()
-    for a, b in connections:
-        nodes_with_inputs.add(b)
-
-    # Bias neurons are required nodes with no incoming connections
-    bias_neurons = required - nodes_with_inputs
+    # Kahn-style layering: a required node is ready once every required node
+    # feeding it is in an earlier layer (links from inputs are always ready).
+    waiting = {n: sum(1 for a in predecessors.get(n, ()) if a in required) for n in required}
 
     layers = []
     # Start with inputs AND bias neurons in the ready set
-    potential_input = set(inputs) | bias_neurons
+    placed = set(inputs) | bias_neurons
 
     # If there are bias neurons, add them as the first layer
     if bias_neurons:
         layers.append(bias_neurons.copy())
 
+    frontier = placed
     while True:
-        # Find candidate nodes c for the next layer.  These nodes should connect
-        # a node in s to a node not in s.
-        c = {b for (a, b) in connections if a in potential_input and b not in potential_input}
-        # Keep only the used nodes whose entire input set is contained in s.
-        next_layer = set()
-        for n in c:
-            # select connections (a, b) where b == n
-            connections_to_n = [(a, b) for (a, b) in connections if b == n and a in required]
-            if n in required and all(a in potential_input for (a, b) in connections_to_n):
-                next_layer.add(n)
-
+        for a in frontier:
+            if a in required:
+                for b in successors.get(a, ()):
+                    if b in waiting:
+                        waiting[b] -= 1
+        # Candidates are fed by the newest layer; keep the ones now ready.
+        next_layer = {b for a in frontier for b in successors.get(a, ())
+                      if b in required and b not in placed and waiting[b] == 0}
         if not next_layer:
             break
 
         layers.append(next_layer)
-        potential_input = potential_input.union(next_layer)
+        placed |= next_layer
+        frontier = next_layer
 
     return layers, required
-
@@ -1,2 +1,2 @@
-from neat.nn.feed_forward import FeedForwardNetwork
+from neat.nn.feed_forward import FeedForwardNetwork, CompiledFeedForwardNetwork
 from neat.nn.recurrent import RecurrentNetwork
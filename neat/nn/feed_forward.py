@@ -1,5 +1,10 @@
-from neat.graphs import feed_forward_layers
+import math
 import random
+from collections import defaultdict
+
+from neat import activations, aggregations
+from neat.graphs import feed_forward_layers
+
 
 class FeedForwardNetwork:
     def __init__(self, inputs, outputs, node_evals):
@@ -24,6 +29,98 @@ class FeedForwardNetwork:
 
         return [self.values[i] for i in self.output_nodes]
 
+    def activate_batch(self, inputs):
+        """
+        Outputs (M, outputs) for M input vectors (M, inputs) at once.
+
+        Each layer (as feed_forward_layers builds them) is one matrix product
+        for its sum-aggregated nodes plus the NumPy aggregations and
+        activations of neat.nn.vectorized; custom functions are applied one
+        input vector at a time. Matches activate() to within rounding.
+        """
+        import numpy as np
+        from neat.nn.vectorized import ACTIVATIONS, AGGREGATIONS
+
+        if getattr(self, "_batch_plan", None) is None:
+            self._batch_plan = self._plan_batch()
+        slots, layers, out_slots = self._batch_plan
+
+        inputs = np.asarray(inputs, dtype=float)
+        if inputs.ndim != 2 or inputs.shape[1] != len(self.input_nodes):
+            raise RuntimeError(f"Expected inputs of shape (M, {len(self.input_nodes):n}), got {inputs.shape}")
+
+        values = np.zeros((len(inputs), slots))
+        values[:, :len(self.input_nodes)] = inputs
+        for offset, sum_cols, weights, others, bias, response, act_groups in layers:
+            s = np.zeros((len(inputs), len(bias)))
+            if len(sum_cols):
+                s[:, sum_cols] = values[:, :offset] @ weights
+            for col, agg_func, src, w in others:
+                terms = values[:, src] * w
+                vectorized = AGGREGATIONS.get(agg_func)
+                s[:, col] = vectorized(terms) if vectorized else [agg_func(list(row)) for row in terms]
+            z = bias + response * s
+            out = values[:, offset:offset + len(bias)]
+            for cols, act_func in act_groups:
+                vectorized = ACTIVATIONS.get(act_func)
+                if vectorized:
+                    out[:, cols] = vectorized(z[:, cols])
+                else:
+                    out[:, cols] = np.vectorize(act_func, otypes=[float])(z[:, cols])
+        return values[:, out_slots]
+
+    def _plan_batch(self):
+        """
+        Layer tensors for activate_batch(): (slots, layers, output slots).
+
+        Every value has a column of one (M, slots) array: the inputs, a column
+        that stays zero (read for outputs and links no node evaluates, which
+        activate() reads as 0.0), then each layer's nodes.
+        """
+        import numpy as np
+
+        depth = {key: -1 for key in self.input_nodes}
+        by_depth = []
+        for node_eval in self.node_evals:
+            node, links = node_eval[0], node_eval[5]
+            d = 1 + max((depth.get(i, -1) for i, w in links), default=-1)
+            depth[node] = d
+            if d == len(by_depth):
+                by_depth.append([])
+            by_depth[d].append(node_eval)
+
+        zero = len(self.input_nodes)
+        slot = {key: i for i, key in enumerate(self.input_nodes)}
+        offset = zero + 1
+        layers = []
+        for layer in by_depth:
+            sum_cols, sum_weights, others, act_groups = [], [], [], {}
+            for col, (node, act_func, agg_func, bias, response, links) in enumerate(layer):
+                if agg_func is aggregations.sum_aggregation:
+                    w = np.zeros(offset)
+                    for i, weight in links:
+                        w[slot.get(i, zero)] += weight
+                    sum_cols.append(col)
+                    sum_weights.append(w)
+                else:
+                    src = np.array([slot.get(i, zero) for i, w in links], dtype=np.intp)
+                    weights = np.array([weight for i, weight in links], dtype=float)
+                    others.append((col, agg_func, src, weights))
+                act_groups.setdefault(act_func, []).append(col)
+            for col, node_eval in enumerate(layer):
+                slot[node_eval[0]] = offset + col
+            weights = np.array(sum_weights).T if sum_weights else np.zeros((offset, 0))
+            layers.append((
+                offset, np.array(sum_cols, dtype=np.intp), weights, others,
+                np.array([e[3] for e in layer], dtype=float),
+                np.array([e[4] for e in layer], dtype=float),
+                [(np.array(cols, dtype=np.intp), f) for f, cols in act_groups.items()],
+            ))
+            offset += len(layer)
+
+        out_slots = np.array([slot.get(key, zero) for key in self.output_nodes], dtype=np.intp)
+        return offset, layers, out_slots
+
     @staticmethod
     def create(genome, config, unique_value=False, random_values=False):
         """ Receives a genome and returns its phenotype (a FeedForwardNetwork). """
@@ -35,12 +132,16 @@ class FeedForwardNetwork:
         node_evals = []
         # Input nodes are not in 'required', but we need to check connections from them too
         required_with_inputs = required.union(set(config.genome_config.input_keys))
+        # Each node's incoming connections, in connection order.
+        incoming = defaultdict(list)
+        for conn_key in connections:
+            incoming[conn_key[1]].append(conn_key)
         for layer in layers:
             for node in layer:
                 inputs = []
-                for conn_key in connections:
+                for conn_key in incoming[node]:
                     inode, onode = conn_key
-                    if onode == node and inode in required_with_inputs:
+                    if inode in required_with_inputs:
                         cg = genome.connections[conn_key]
                         if random_values:
                             cg.weight = random.uniform(-1.0, 1.0)
@@ -54,3 +155,112 @@ class FeedForwardNetwork:
                 node_evals.append((node, activation_function, aggregation_function, ng.bias, ng.response, inputs))
 
         return FeedForwardNetwork(config.genome_config.input_keys, config.genome_config.output_keys, node_evals)
+
+
+# Activations written out in the generated source instead of called; the
+# clamps are spelled so they give what the max()/min() ones in
+# neat.activations give, NaN included.
+_INLINE_ACTIVATIONS = {
+    activations.sigmoid_activation:
+        "z = 5.0 * ({z})\n"
+        "z = z if z < 60.0 else 60.0\n"
+        "z = z if z > -60.0 else -60.0\n"
+        "{v} = 1.0 / (1.0 + exp(-z))",
+    activations.tanh_activation:
+        "z = 2.5 * ({z})\n"
+        "z = z if z < 60.0 else 60.0\n"
+        "{v} = tanh(z if z > -60.0 else -60.0)",
+    activations.relu_activation:
+        "z = {z}\n"
+        "{v} = z if z > 0.0 else 0.0",
+    activations.identity_activation:
+        "{v} = {z}",
+    activations.clamped_activation:
+        "z = {z}\n"
+        "z = z if z < 1.0 else 1.0\n"
+        "{v} = z if z > -1.0 else -1.0",
+}
+
+
+class CompiledFeedForwardNetwork(FeedForwardNetwork):
+    """
+    A FeedForwardNetwork whose ``activate`` is generated Python source for
+    one genome: a local variable per node, weights, biases and responses
+    written in as constants, and no dict or per-link loop. The source is
+    compiled once in ``create``; ``self.source`` keeps it for inspection.
+
+    Outputs are what FeedForwardNetwork.activate returns for the same
+    genome (sum-aggregated links are added in the same order), and
+    ``input_nodes``, ``output_nodes`` and ``node_evals`` are kept, so it can
+    stand in wherever a FeedForwardNetwork is used.
+    """
+
+    def __init__(self, inputs, outputs, node_evals):
+        super().__init__(inputs, outputs, node_evals)
+        self.source, namespace = self._generate(inputs, outputs, node_evals)
+        exec(compile(self.source, "<CompiledFeedForwardNetwork>", "exec"), namespace)
+        self.activate = namespace["activate"]
+
+    def __getstate__(self):
+        # Functions built by exec() don't pickle; rebuild from node_evals instead.
+        state = self.__dict__.copy()
+        del state["activate"]
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(state["input_nodes"], state["output_nodes"], state["node_evals"])
+
+    @staticmethod
+    def _generate(inputs, outputs, node_evals):
+        """(source, globals) of an ``activate(inputs)`` for these node evals."""
+        namespace = {"exp": math.exp, "tanh": math.tanh}
+        names = {}
+        funcs = {}
+
+        def const(x):
+            x = float(x)
+            if math.isfinite(x):
+                return repr(x)
+            name = f"c{len(namespace)}"
+            namespace[name] = x
+            return name
+
+        def func(f):
+            if f not in funcs:
+                funcs[f] = f"f{len(namespace)}"
+                namespace[funcs[f]] = f
+            return funcs[f]
+
+        lines = [
+            "def activate(inputs):",
+            f"    if len(inputs) != {len(inputs)}:",
+            f"        raise RuntimeError(f'Expected {len(inputs):n} inputs, got {{len(inputs):n}}')",
+        ]
+        for k in inputs:
+            names[k] = f"v{len(names)}"
+        if inputs:
+            lines.append(f"    {', '.join(names[k] for k in inputs)}{',' if len(inputs) == 1 else ''} = inputs")
+
+        for node, act_func, agg_func, bias, response, links in node_evals:
+            terms = [f"{names.get(i, '0.0')} * {const(w)}" for i, w in links]
+            if agg_func is aggregations.sum_aggregation:
+                s = " + ".join(terms) if terms else "0"
+            else:
+                s = f"{func(agg_func)}([{', '.join(terms)}])"
+            z = f"{const(bias)} + " + (f"({s})" if response == 1.0 else f"{const(response)} * ({s})")
+            names[node] = v = f"v{len(names)}"
+            if act_func in _INLINE_ACTIVATIONS:
+                body = _INLINE_ACTIVATIONS[act_func].format(v=v, z=z)
+            else:
+                body = f"{v} = {func(act_func)}({z})"
+            lines.extend("    " + line for line in body.splitlines())
+
+        # Outputs no node evaluates (not connected to anything) read 0.0, as in activate().
+        lines.append(f"    return [{', '.join(names.get(k, '0.0') for k in outputs)}]")
+        return "\n".join(lines) + "\n", namespace
+
+    @staticmethod
+    def create(genome, config, unique_value=False, random_values=False):
+        """ Receives a genome and returns its compiled phenotype. """
+        net = FeedForwardNetwork.create(genome, config, unique_value, random_values)
+        return CompiledFeedForwardNetwork(net.input_nodes, net.output_nodes, net.node_evals)
@@ -0,0 +1,70 @@
+"""
+NumPy counterparts of the built-in activation and aggregation functions,
+for evaluating networks on many inputs at once.
+
+Activations map an array of node inputs elementwise, clamps included.
+Aggregations reduce an (M, links) array of weighted inputs along axis 1 and
+return what the scalar function returns for each row, including for nodes
+with no links. Functions without a counterpart here are not supported by
+these tables; callers fall back to the scalar function.
+"""
+
+import numpy as np
+
+from neat import activations, aggregations
+
+_SELU_LAMBDA = 1.0507009873554804934193349852946
+_SELU_ALPHA = 1.6732632423543772848170429916717
+
+
+def _inv(z):
+    with np.errstate(divide="ignore"):
+        return np.where(z == 0.0, 0.0, 1.0 / np.where(z == 0.0, 1.0, z))
+
+
+ACTIVATIONS = {
+    activations.sigmoid_activation: lambda z: 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0))),
+    activations.tanh_activation: lambda z: np.tanh(np.clip(2.5 * z, -60.0, 60.0)),
+    activations.sin_activation: lambda z: np.sin(np.clip(5.0 * z, -60.0, 60.0)),
+    activations.gauss_activation: lambda z: np.exp(-5.0 * np.clip(z, -3.4, 3.4) ** 2),
+    activations.relu_activation: lambda z: np.where(z > 0.0, z, 0.0),
+    activations.elu_activation: lambda z: np.where(z > 0.0, z, np.exp(np.minimum(z, 0.0)) - 1),
+    activations.lelu_activation: lambda z: np.where(z > 0.0, z, 0.005 * z),
+    activations.selu_activation: lambda z: np.where(
+        z > 0.0, _SELU_LAMBDA * z, _SELU_LAMBDA * _SELU_ALPHA * (np.exp(np.minimum(z, 0.0)) - 1)),
+    activations.softplus_activation: lambda z: 0.2 * np.log(1 + np.exp(np.clip(5.0 * z, -60.0, 60.0))),
+    activations.identity_activation: lambda z: z,
+    activations.clamped_activation: lambda z: np.clip(z, -1.0, 1.0),
+    activations.inv_activation: _inv,
+    activations.log_activation: lambda z: np.log(np.maximum(z, 1e-7)),
+    activations.exp_activation: lambda z: np.exp(np.clip(z, -60.0, 60.0)),
+    activations.abs_activation: np.abs,
+    activations.hat_activation: lambda z: np.maximum(0.0, 1 - np.abs(z)),
+    activations.square_activation: lambda z: z ** 2,
+    activations.cube_activation: lambda z: z ** 3,
+}
+
+
+def _or_zero(reduce):
+    """Reduction that gives 0.0 for nodes with no links, as the scalar versions do."""
+    def aggregate(x):
+        if x.shape[1] == 0:
+            return np.zeros(len(x))
+        return reduce(x)
+    return aggregate
+
+
+def _maxabs(x):
+    # First of the largest magnitudes, as max(x, key=abs) picks.
+    return np.take_along_axis(x, np.argmax(np.abs(x), axis=1)[:, None], axis=1)[:, 0]
+
+
+AGGREGATIONS = {
+    aggregations.sum_aggregation: lambda x: x.sum(axis=1),
+    aggregations.product_aggregation: lambda x: x.prod(axis=1),
+    aggregations.max_aggregation: _or_zero(lambda x: x.max(axis=1)),
+    aggregations.min_aggregation: _or_zero(lambda x: x.min(axis=1)),
+    aggregations.maxabs_aggregation: _or_zero(_maxabs),
+    aggregations.median_aggregation: _or_zero(lambda x: np.median(x, axis=1)),
+    aggregations.mean_aggregation: _or_zero(lambda x: x.mean(axis=1)),
+}
@@ -1,9 +1,17 @@
 import time
 import math
+import multiprocessing
+import numpy as np
 import pygame
 from collections import deque
 
+from car_batch import CarBatch
 from cars import NEATCar
+from population_network import PopulationNetwork
+from sim_clock import SimClock
+from track_fields import march_batch, mask_to_array, raycast_batch
+
+import resources
 
 import neat
 
@@ -40,27 +48,41 @@ class NEATManager:
                  fps=60,
                  time_limit_sec=20.0,
                  stuck_speed_thresh=0.1,
-                 stuck_time_sec=2.0):
+                 stuck_time_sec=2.0,
+                 batch_sensing=True,       # sense all live cars in one call (with resources.raycast_mask)
+                 batch_physics=True,       # steer and move all live cars as one CarBatch
+                 batch_networks=True,      # with batch_physics: run all nets as one PopulationNetwork
+                 clock=None,               # SimClock to step on (default: a new one at fps)
+                 population=None,          # neat.Population to continue (e.g. from a Checkpointer)
+                 workers=0,                # >0: run each generation's episodes on this many processes
+                 level=None):              # track level the worker processes load (needed with workers)
         self.config = neat_config
-        self.pop = neat.Population(self.config)
+        self.pop = population or neat.Population(self.config)
         self.pop.add_reporter(neat.StdOutReporter(True))
         self.stats = neat.StatisticsReporter()
         self.pop.add_reporter(self.stats)
 
-        # Environment
-        self.track_mask = track_mask
-        self.raycast_fn = raycast_fn
-        self.car_factory = car_factory
-
-        # Episode controls
-        self.fps = fps
-        self.time_limit = time_limit_sec
-        self.stuck_thresh = stuck_speed_thresh
-        self.stuck_time_sec = stuck_time_sec
-        self._speed_window_frames = max(1, int(self.stuck_time_sec * self.fps))
+        self._init_environment(car_factory, track_mask, raycast_fn, fps, time_limit_sec,
+                               stuck_speed_thresh, stuck_time_sec, batch_sensing, batch_physics,
+                               batch_networks, clock)
+        # Everything but the track mask, for the worker processes to rebuild the environment
+        self._shard_settings = dict(
+            car_factory=car_factory, raycast_fn=raycast_fn, fps=self.fps,
+            time_limit_sec=time_limit_sec, stuck_speed_thresh=stuck_speed_thresh,
+            stuck_time_sec=stuck_time_sec, batch_sensing=batch_sensing,
+            batch_physics=batch_physics, batch_networks=batch_networks, clock=None,
+        )
+
+        # Sharded evaluation (see _update_sharded)
+        if workers and level is None:
+            raise ValueError("NEATManager needs the track level to evaluate on worker processes")
+        self.workers = workers
+        self.level = level
+        self._pool = None
 
         # Runtime state
-        self.generation = 0
+        self.generation = self.pop.generation
+        self.last_generation_sim_seconds = 0.0  # genome-seconds simulated in the last finished generation
         self._genomes_list = []            # [(id, genome), ...] for current generation
         self._fitness_map = {}             # genome_id -> fitness
         self._episodes = []                # list[NEATEpisode]
@@ -71,6 +93,30 @@ class NEATManager:
         # Prepare first generation
         self._begin_generation()
 
+    def _init_environment(self, car_factory, track_mask, raycast_fn, fps, time_limit_sec,
+                          stuck_speed_thresh, stuck_time_sec, batch_sensing, batch_physics,
+                          batch_networks, clock):
+        # Environment
+        self.track_mask = track_mask
+        self.raycast_fn = raycast_fn
+        self.car_factory = car_factory
+        # Batch sensing reproduces resources.raycast_mask; other raycasters are called per car.
+        self.batch_sensing = batch_sensing and raycast_fn is resources.raycast_mask
+        self.batch_physics = batch_physics
+        self.batch_networks = batch_networks
+        self._car_batch = None             # CarBatch holding this generation's cars
+        self._population_net = None        # PopulationNetwork of their nets, rows as in _car_batch
+        self._sensor_mask = None           # track_mask that _sensor_walls was built from
+        self._sensor_walls = None
+
+        # Episode controls (every update() is one fixed step of clock.dt seconds)
+        self.clock = clock or SimClock(fps)
+        self.fps = self.clock.hz
+        self.time_limit = time_limit_sec
+        self.stuck_thresh = stuck_speed_thresh
+        self.stuck_time_sec = stuck_time_sec
+        self._speed_window_frames = max(1, int(self.stuck_time_sec * self.fps))
+
     def reset(self):
         """
         Completely restarts NEAT training from generation 0.
@@ -149,18 +195,38 @@ class NEATManager:
         self._genomes_list = list(self.pop.population.items())  # [(genome_id, genome), ...]
         self._fitness_map.clear()
         self._episodes = []
+        self._car_batch = None
         
         self._crash_markers.clear()
 
         # For neat-python StatisticsReporter, try to keep generation number in sync
         self.generation = getattr(self.stats, 'generation', self.generation)
 
-        # Build car + net for every genome, all at once
-        for gid, genome in self._genomes_list:
-            net = neat.nn.FeedForwardNetwork.create(genome, self.config)
+        # Worker processes build their own cars (see _update_sharded)
+        if not self.workers:
+            self._start_episodes(self._genomes_list)
+
+    def _start_episodes(self, genomes):
+        """Build car + net for every genome, all at once."""
+        self._episodes = []
+        self._car_batch = CarBatch(len(genomes)) if self.batch_physics else None
+        nets = [neat.nn.FeedForwardNetwork.create(genome, self.config) for _, genome in genomes]
+
+        # None when some net can't be packed (see PopulationNetwork.create); cars think one by one then,
+        # each with its net compiled to straight-line code.
+        self._population_net = None
+        if self._car_batch is not None and self.batch_networks:
+            self._population_net = PopulationNetwork.create(nets)
+        if self._population_net is None:
+            nets = [neat.nn.CompiledFeedForwardNetwork(net.input_nodes, net.output_nodes, net.node_evals)
+                    for net in nets]
+
+        for (gid, genome), net in zip(genomes, nets):
             car = self.car_factory()
             # Provide the net to the car
             car.set_net(net)
+            if self._car_batch is not None:
+                self._car_batch.attach(car)
             # If your car needs raycast_fn or track_mask, ensure car_factory wired them in.
             ep = NEATEpisode(gid, genome, net, car, speed_window_frames=self._speed_window_frames)
             self._episodes.append(ep)
@@ -254,24 +320,143 @@ class NEATManager:
 
         return False, ""
 
+    def _sensor_array(self):
+        """Wall array for track_mask, rebuilt when main swaps in a new level's mask."""
+        if self._sensor_mask is not self.track_mask:
+            self._sensor_walls = mask_to_array(self.track_mask)
+            self._sensor_mask = self.track_mask
+        return self._sensor_walls
+
+    def _sense_batch(self, episodes):
+        """
+        Cast every sensor ray of every live car in one call, the way
+        resources.raycast_mask (what the cars sense with in a race) would:
+        sphere-tracing the level's distance field, or marching the mask.
+        """
+        cars = [ep.car for ep in episodes]
+        origins, dirs = NEATCar.sensor_rays_batch(cars)
+        angles = np.arctan2(dirs[..., 1], dirs[..., 0])
+        sensor_length = cars[0].sensor_length
+        field = resources.raycast_field_for(self.track_mask)
+        if field is not None:
+            distances, hits = raycast_batch(field, origins.reshape(-1, 2), angles.reshape(-1),
+                                            max_distance=sensor_length)
+        else:
+            distances, hits = march_batch(self._sensor_array(), origins.reshape(-1, 2), angles.reshape(-1),
+                                          max_distance=sensor_length, step=3)
+        distances = distances.reshape(angles.shape)
+        hits = hits.reshape(angles.shape)
+        return NEATCar.set_sensor_readings_batch(cars, origins, dirs, distances, hits)
+
+    def _drive_batch(self, episodes):
+        """
+        Sense, then think (all nets in one PopulationNetwork call where they
+        could be packed), then steer and move every car in one CarBatch step.
+        """
+        cars = [ep.car for ep in episodes]
+        if self.batch_sensing:
+            inputs = self._sense_batch(episodes)
+        else:
+            for car in cars:
+                car.sense(self.track_mask, self.raycast_fn)
+            inputs = [car.inputs for car in cars]
+        rows = self._car_batch.rows(cars)
+        if self._population_net is not None:
+            outputs = self._population_net.activate(inputs, rows)
+        else:
+            for car in cars:
+                car.think()
+            outputs = [car.outputs for car in cars]
+        NEATCar.apply_controls_batch(self._car_batch, rows, outputs)
+        self._car_batch.step(rows)
+
     # ---------------------------
     # Loop hooks
     # ---------------------------
-    def update(self, dt):
+    def update(self, dt=None):
+        """
+        Advance every live episode by one fixed sim step (clock.dt seconds).
+        With workers, run the whole generation on them instead. ``dt`` is
+        accepted for callers written against the old ``update(dt)`` and
+        ignored: the step length is always the clock's.
+        """
+        if self.workers:
+            return self._update_sharded()
         if not self._episodes:
             # Shouldn't happen, but guard against empty generation
             return (self.generation, 0, 0)
 
-        finished_count = 0
         total = len(self._episodes)
+        finished_count = self._step_episodes()
+
+        # All cars finished? Advance generation immediately.
+        if finished_count >= total:
+            self.last_generation_sim_seconds = sum(ep.elapsed for ep in self._episodes)
+            self._advance_generation()
+            # After advancing, the new generation starts with 0 finished
+            return (self.generation, 0, len(self._episodes))
+
+        return (self.generation, finished_count, total)
+
+    def _update_sharded(self):
+        """
+        Split the generation's genomes across the worker pool, run every
+        episode to the end there, then advance the generation.
+        """
+        if self._pool is None:
+            # spawn: workers start clean rather than as forks of a pygame process
+            self._pool = multiprocessing.get_context("spawn").Pool(
+                self.workers, _init_shard_worker, (self.level, self.config, self._shard_settings))
+
+        genomes = self._genomes_list
+        n_shards = max(1, min(len(genomes), self.workers * SHARDS_PER_WORKER))
+        sim_seconds = 0.0
+        shards = [genomes[i::n_shards] for i in range(n_shards)]
+        for fitness, markers, seconds in self._pool.imap_unordered(_run_shard, shards):
+            self._fitness_map.update(fitness)
+            self._crash_markers.extend(markers)
+            sim_seconds += seconds
+
+        self.last_generation_sim_seconds = sim_seconds
+        self._advance_generation()
+        return (self.generation, 0, len(self._genomes_list))
+
+    def close(self):
+        """Shut down the worker processes, if any were started."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def _step_episodes(self):
+        """One sim step of every live episode. Returns how many have finished."""
+        dt = self.clock.dt
+        finished_count = 0
+
+        live = [ep for ep in self._episodes if not ep.finished]
+        if self._car_batch is not None:
+            self._car_batch.save_poses()
+        else:
+            for ep in live:
+                ep.car.save_pose()
+        if live:
+            if self._car_batch is not None:
+                self._drive_batch(live)
+            elif self.batch_sensing:
+                self._sense_batch(live)
 
         for ep in self._episodes:
             if ep.finished:
                 finished_count += 1
                 continue
 
-            # Sense -> think -> control -> move
-            ep.car.move()
+            # Sense -> think -> control -> move (already done above for a CarBatch)
+            if self._car_batch is not None:
+                pass
+            elif self.batch_sensing:
+                ep.car.drive()
+            else:
+                ep.car.move()
 
             # Fitness update
             #on_road = self._on_road(ep.car)
@@ -284,7 +469,8 @@ class NEATManager:
 
             # Track speed history for stuck detection
             # Assuming car.vel is scalar speed; if it's a vector, use magnitude
-            speed_val = ep.car.vel if isinstance(ep.car.vel, (int, float)) else (ep.car.vel.length() if hasattr(ep.car.vel, "length") else float(ep.car.vel))
+            vel = ep.car.vel
+            speed_val = vel if isinstance(vel, (int, float)) else (vel.length() if hasattr(vel, "length") else float(vel))
             ep.speed_history.append(speed_val)
 
             # Episode termination?
@@ -302,13 +488,7 @@ class NEATManager:
 
                 finished_count += 1
 
-        # All cars finished? Advance generation immediately.
-        if finished_count >= total:
-            self._advance_generation()
-            # After advancing, the new generation starts with 0 finished
-            return (self.generation, 0, len(self._episodes))
-
-        return (self.generation, finished_count, total)
+        return finished_count
 
     
     def draw(self, win, images, draw_sensors=True, draw_crosses=True):
@@ -331,4 +511,43 @@ class NEATManager:
         """Draws a simple 'X' centered at pos."""
         x, y = pos
         pygame.draw.line(surface, color, (x - size, y - size), (x + size, y + size), width)
-        pygame.draw.line(surface, color, (x - size, y + size), (x + size, y - size), width)
\ No newline at end of file
+        pygame.draw.line(surface, color, (x - size, y + size), (x + size, y - size), width)
+
+
+# ---------------------------
+# Sharded evaluation (worker processes)
+# ---------------------------
+SHARDS_PER_WORKER = 2  # more, smaller shards even out episodes that run long
+
+_shard = None  # this worker process's _EpisodeShard
+
+
+class _EpisodeShard(NEATManager):
+    """NEATManager's episode stepping without a population, for one worker process."""
+
+    def __init__(self, config, track_mask, settings):
+        self.config = config
+        self._init_environment(track_mask=track_mask, **settings)
+        self._episodes = []
+        self._fitness_map = {}
+        self._crash_markers = []
+
+    def run(self, genomes):
+        """Run the genomes' episodes to the end: (fitness by genome id, crash markers, sim seconds)."""
+        self._fitness_map, self._crash_markers = {}, []
+        self._start_episodes(genomes)
+        while self._step_episodes() < len(self._episodes):
+            pass
+        return self._fitness_map, self._crash_markers, sum(ep.elapsed for ep in self._episodes)
+
+
+def _init_shard_worker(level, config, settings):
+    """Pool initializer: load the level's track mask once per worker."""
+    global _shard
+    import resources
+    resources.load_track_for_level(level)
+    _shard = _EpisodeShard(config, resources.TRACK_BORDER_MASK, settings)
+
+
+def _run_shard(genomes):
+    return _shard.run(genomes)
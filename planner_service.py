@@ -0,0 +1,187 @@
+"""
+Off-frame path planning.
+
+Cars hand their searches to a ``PlannerService`` and get a ``PlanFuture``
+back, then keep driving their previous path (or straight at the goal) until
+the result arrives, so a slow search no longer stalls rendering and input.
+
+Where threads exist the searches run on one worker thread. The WebAssembly
+build (pygbag) has none; there ``pump`` runs queued searches on the main
+thread between frames. Either way searches only start while the frame's
+budget, granted by calling ``pump`` once a frame, lasts: the worker shares
+the GIL with the game loop, so running searches back to back would still
+eat into the frame.
+Submitting under a key that is still waiting on an older search cancels the
+older one: it is dropped if it has not started, and its result is discarded
+if it has.
+
+In thread mode the submitted function runs on the worker, so it must not
+write to the car; return what it found (e.g. search stats) in its result
+and apply it when the future is collected on the main thread.
+"""
+
+import sys
+import time
+import weakref
+from collections import deque
+
+try:
+    import threading
+except ImportError:  # no threads on this platform
+    threading = None
+
+_PENDING, _RUNNING, _DONE, _CANCELLED = range(4)
+
+
+def threads_available():
+    return threading is not None and sys.platform != "emscripten"
+
+
+class _NoLock:
+    """Stands in for threading.Lock where there are no threads."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class PlanFuture:
+    """Result of one submitted search, filled in once it has run."""
+    __slots__ = ("_fn", "_args", "_state", "_result", "_error", "_lock")
+
+    def __init__(self, fn, args):
+        self._fn = fn
+        self._args = args
+        self._state = _PENDING
+        self._result = None
+        self._error = None
+        self._lock = threading.Lock() if threading is not None else _NoLock()
+
+    def done(self):
+        """True once the search has finished or was cancelled."""
+        return self._state in (_DONE, _CANCELLED)
+
+    def cancelled(self):
+        return self._state == _CANCELLED
+
+    def cancel(self):
+        """Cancel unless already finished. Returns whether it was cancelled."""
+        with self._lock:
+            if self._state in (_PENDING, _RUNNING):
+                self._state = _CANCELLED
+                return True
+            return self._state == _CANCELLED
+
+    def result(self):
+        """The search's return value (None if cancelled); re-raises its error."""
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _run(self):
+        with self._lock:
+            if self._state != _PENDING:
+                return
+            self._state = _RUNNING
+        try:
+            result, error = self._fn(*self._args), None
+        except Exception as e:
+            result, error = None, e
+        # Result and state change together, so a cancel() racing this either
+        # wins (the result is dropped) or sees a finished future.
+        with self._lock:
+            if self._state == _RUNNING:
+                self._result, self._error = result, error
+                self._state = _DONE
+
+
+class PlannerService:
+    """Runs submitted searches off the frame and hands back PlanFutures."""
+
+    def __init__(self, threaded=None):
+        self.threaded = threads_available() if threaded is None else threaded
+        self._latest = weakref.WeakKeyDictionary()  # key -> newest PlanFuture
+        self._queue = deque()  # futures waiting for their turn
+        self._cond = None  # thread mode: guards _queue, _allowance and _stopping
+        self._allowance = 0.0  # thread mode: search time left in this frame
+        self._stopping = False
+        self._worker = None
+        if self.threaded:
+            self._cond = threading.Condition()
+            self._worker = threading.Thread(target=self._work, name="planner", daemon=True)
+            self._worker.start()
+
+    def submit(self, key, fn, *args):
+        """
+        Queue ``fn(*args)`` and return its PlanFuture. Any unfinished search
+        submitted earlier under ``key`` (usually the car) is cancelled; with
+        ``key`` None nothing is replaced. It starts on a later pump().
+        """
+        future = PlanFuture(fn, args)
+        if key is not None:
+            old = self._latest.get(key)
+            if old is not None and not old.done():
+                old.cancel()
+            self._latest[key] = future
+        if self.threaded:
+            with self._cond:
+                self._queue.append(future)
+        else:
+            self._queue.append(future)
+        return future
+
+    def cancel(self, key):
+        """Cancel the unfinished search submitted under ``key``, if any."""
+        future = self._latest.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def pump(self, budget_sec=0.004):
+        """
+        Give queued searches ``budget_sec`` of this frame. Without a worker
+        thread they run here until it is spent; with one, the worker starts
+        searches until it has used that much time, then waits for the next
+        pump(). A search is never split, so one may run past the budget.
+        Returns how many are still queued.
+        """
+        if self.threaded:
+            with self._cond:
+                self._allowance = budget_sec
+                self._cond.notify()
+                return len(self._queue)
+        deadline = time.perf_counter() + budget_sec
+        while self._queue and time.perf_counter() < deadline:
+            self._queue.popleft()._run()
+        return len(self._queue)
+
+    def shutdown(self):
+        """Cancel everything queued and stop the worker thread."""
+        if self._worker is None:
+            for future in self._queue:
+                future.cancel()
+            self._queue.clear()
+            return
+        with self._cond:
+            for future in self._queue:
+                future.cancel()
+            self._queue.clear()
+            self._stopping = True
+            self._cond.notify()
+        self._worker.join()
+        self._worker = None
+
+    def _work(self):
+        cond = self._cond
+        while True:
+            with cond:
+                while not self._stopping and not (self._queue and self._allowance > 0.0):
+                    cond.wait()
+                if self._stopping:
+                    return
+                future = self._queue.popleft()
+            t0 = time.perf_counter()
+            future._run()
+            with cond:
+                self._allowance -= time.perf_counter() - t0
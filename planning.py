@@ -0,0 +1,672 @@
+"""
+Grid path planners shared by the cars and the offline track compiler.
+
+All planners work on an ``OccupancyGrid`` in (row, col) cells and return the
+cells from start to goal inclusive, or ``[]`` if the goal is unreachable.
+"""
+
+import heapq
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from track_fields import distance_field
+
+DIAGONAL_COST = 1.414
+_TIE = 1e-3  # step totals closer than this count as equally short
+
+# (dr, dc, cost) in the order DijkstraCar has always expanded them.
+NEIGHBORS_8 = (
+    (-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+    (-1, -1, DIAGONAL_COST), (-1, 1, DIAGONAL_COST),
+    (1, -1, DIAGONAL_COST), (1, 1, DIAGONAL_COST),
+)
+
+
+class SearchStats:
+    """Counters for one search: nodes expanded, heap pushes and wall time."""
+    __slots__ = ("expanded", "pushed", "seconds")
+
+    def __init__(self):
+        self.expanded = 0
+        self.pushed = 0
+        self.seconds = 0.0
+
+    def __repr__(self):
+        return (f"SearchStats(expanded={self.expanded}, pushed={self.pushed}, "
+                f"ms={self.seconds * 1000:.2f})")
+
+
+def dijkstra_path(grid, start, goal, stats=None):
+    """
+    8-connected Dijkstra (diagonals cost 1.414), same result as DijkstraCar.
+    Fills ``stats`` (a SearchStats) if given.
+    """
+    t0 = time.perf_counter()
+    expanded = pushed = 0
+    path = []
+
+    if grid.is_free(*start) and grid.is_free(*goal):
+        rows, cols = grid.rows, grid.cols
+        free = grid.free
+
+        open_set = [(0, start)]
+        pushed = 1
+        visited = set()
+        came_from = {}
+        cost_so_far = {start: 0}
+
+        while open_set:
+            current_cost, current = heapq.heappop(open_set)
+            if current in visited:
+                continue
+            visited.add(current)
+            expanded += 1
+
+            if current == goal:
+                path = _reconstruct(came_from, current)
+                break
+
+            cr, cc = current
+            for dr, dc, move_cost in NEIGHBORS_8:
+                nr, nc = cr + dr, cc + dc
+                if not (0 <= nr < rows and 0 <= nc < cols) or not free[nr * cols + nc]:
+                    continue
+                node = (nr, nc)
+                if node in visited:
+                    continue
+                new_cost = cost_so_far[current] + move_cost
+                if node not in cost_so_far or new_cost < cost_so_far[node]:
+                    cost_so_far[node] = new_cost
+                    came_from[node] = current
+                    heapq.heappush(open_set, (new_cost, node))
+                    pushed += 1
+
+    if stats is not None:
+        stats.expanded, stats.pushed = expanded, pushed
+        stats.seconds = time.perf_counter() - t0
+    return path
+
+
+def _reconstruct(came_from, node):
+    path = [node]
+    while node in came_from:
+        node = came_from[node]
+        path.append(node)
+    path.reverse()
+    return path
+
+
+_WALL_CLEARANCE = weakref.WeakKeyDictionary()  # grid -> float32 (rows, cols)
+_FLAT_CLEARANCE = weakref.WeakKeyDictionary()  # grid -> the same as a flat list
+
+
+def wall_clearance(grid):
+    """Distance in cells from each cell to the nearest wall cell (capped at 8), cached per grid."""
+    clearance = _WALL_CLEARANCE.get(grid)
+    if clearance is None:
+        clearance = distance_field(~grid.array, cap=8)
+        _WALL_CLEARANCE[grid] = clearance
+    return clearance
+
+
+def _flat_clearance(grid):
+    flat = _FLAT_CLEARANCE.get(grid)
+    if flat is None:
+        flat = wall_clearance(grid).ravel().tolist()
+        _FLAT_CLEARANCE[grid] = flat
+    return flat
+
+
+def octile(r0, c0, r1, c1):
+    """Exact 8-connected distance on an empty grid, so A* stays admissible."""
+    dr, dc = abs(r0 - r1), abs(c0 - c1)
+    return (dr + dc) + (DIAGONAL_COST - 2.0) * min(dr, dc)
+
+
+def astar_path(grid, start, goal, stats=None):
+    """
+    A* with the octile heuristic over the same 8-connected costs as
+    ``dijkstra_path``, so both return equally short paths.
+
+    Cells are flat indices; the closed set is a bytearray over the grid and
+    costs/parents live in flat lists, so no tuples are hashed in the loop.
+    Ties on f go to the node further from the walls, then to the one with
+    the smaller heuristic, and of two equally short parents the one with more
+    clearance is kept. Among equally short paths this picks one that does not
+    hug inside corners, which DijkstraCar's point-vs-mask mover can stall on.
+    Fills ``stats`` (a SearchStats) if given.
+    """
+    t0 = time.perf_counter()
+    expanded = pushed = 0
+    path = []
+
+    if grid.is_free(*start) and grid.is_free(*goal):
+        rows, cols = grid.rows, grid.cols
+        free = grid.free
+        n = rows * cols
+        gr, gc = goal
+        goal_i = gr * cols + gc
+        d2 = DIAGONAL_COST - 2.0
+
+        closed = bytearray(n)
+        g_cost = [float("inf")] * n
+        parent = [-1] * n
+        clear = _flat_clearance(grid)
+
+        s = start[0] * cols + start[1]
+        g_cost[s] = 0.0
+        h = octile(start[0], start[1], gr, gc)
+        open_set = [(h, -clear[s], h, s)]
+        pushed = 1
+        pop, push = heapq.heappop, heapq.heappush
+
+        while open_set:
+            _, _, _, i = pop(open_set)
+            if closed[i]:
+                continue
+            closed[i] = 1
+            expanded += 1
+
+            if i == goal_i:
+                while i != -1:
+                    path.append(divmod(i, cols))
+                    i = parent[i]
+                path.reverse()
+                break
+
+            r, c = divmod(i, cols)
+            gi = g_cost[i]
+            for dr, dc, move_cost in NEIGHBORS_8:
+                nr, nc = r + dr, c + dc
+                if not (0 <= nr < rows and 0 <= nc < cols):
+                    continue
+                j = nr * cols + nc
+                if not free[j] or closed[j]:
+                    continue
+                ng = gi + move_cost
+                gj = g_cost[j]
+                if ng < gj - _TIE:
+                    g_cost[j] = ng
+                    parent[j] = i
+                    ar, ac = abs(nr - gr), abs(nc - gc)
+                    hj = ar + ac + d2 * (ar if ar < ac else ac)
+                    push(open_set, (ng + hj, -clear[j], hj, j))
+                    pushed += 1
+                elif ng < gj + _TIE and clear[i] > clear[parent[j]]:
+                    parent[j] = i
+
+    if stats is not None:
+        stats.expanded, stats.pushed = expanded, pushed
+        stats.seconds = time.perf_counter() - t0
+    return path
+
+
+_PADDED_FREE = weakref.WeakKeyDictionary()  # grid -> (bytes, width)
+
+
+def padded_free(grid):
+    """
+    ``(free, width)``: the grid's free flags as bytes, flat, with a one-cell
+    wall border so neighbour lookups never go out of bounds. Cell (r, c) is
+    at ``(r + 1) * width + c + 1``.
+    """
+    entry = _PADDED_FREE.get(grid)
+    if entry is None:
+        width = grid.cols + 2
+        padded = np.zeros((grid.rows + 2, width), dtype=bool)
+        padded[1:-1, 1:-1] = grid.array
+        entry = (padded.tobytes(), width)
+        _PADDED_FREE[grid] = entry
+    return entry
+
+
+def _jump_straight(free, i, step, side, goal):
+    """Scan from ``i`` along ``step`` to the next jump point, or -1 at a wall."""
+    while True:
+        i += step
+        if not free[i]:
+            return -1
+        if i == goal:
+            return i
+        # A wall beside us that opens up one step ahead forces a turn here.
+        if (not free[i + side] and free[i + side + step]) or \
+                (not free[i - side] and free[i - side + step]):
+            return i
+
+
+def _jump(free, i, dr, dc, width, goal):
+    """Jump from ``i`` in direction (dr, dc); the next jump point or -1."""
+    if not dr:
+        return _jump_straight(free, i, dc, width, goal)
+    if not dc:
+        return _jump_straight(free, i, dr * width, 1, goal)
+    row_step = dr * width
+    while True:
+        i += row_step + dc
+        if not free[i]:
+            return -1
+        if i == goal:
+            return i
+        if (not free[i - dc] and free[i - dc + row_step]) or \
+                (not free[i - row_step] and free[i - row_step + dc]):
+            return i
+        # Any jump point straight ahead on either axis makes this one too.
+        if _jump_straight(free, i, dc, width, goal) != -1 or \
+                _jump_straight(free, i, row_step, 1, goal) != -1:
+            return i
+
+
+def _jps_directions(free, i, dr, dc, width):
+    """Natural and forced successor directions of ``i`` reached moving (dr, dc)."""
+    if not dr and not dc:
+        return [(dr_, dc_) for dr_, dc_, _ in NEIGHBORS_8]
+    if not dr:
+        dirs = [(0, dc)]
+        if not free[i - width]:
+            dirs.append((-1, dc))
+        if not free[i + width]:
+            dirs.append((1, dc))
+        return dirs
+    if not dc:
+        dirs = [(dr, 0)]
+        if not free[i - 1]:
+            dirs.append((dr, -1))
+        if not free[i + 1]:
+            dirs.append((dr, 1))
+        return dirs
+    dirs = [(dr, 0), (0, dc), (dr, dc)]
+    if not free[i - dr * width]:
+        dirs.append((-dr, dc))
+    if not free[i - dc]:
+        dirs.append((dr, -dc))
+    return dirs
+
+
+def jps_path(grid, start, goal, stats=None):
+    """
+    Jump Point Search over the same 8-connected costs as ``dijkstra_path``
+    (diagonals may cut corners, as there), so paths are equally short.
+
+    Straight and diagonal runs are scanned without touching the heap; only
+    jump points (cells where the optimal route may turn) are pushed and
+    expanded, which is what ``stats.expanded`` counts. The returned path is
+    filled back in cell by cell, so callers see the same shape of result as
+    from the other planners. Jump points sit on wall corners, so the filled
+    path is passed through ``relax_path`` to move it off them.
+    """
+    t0 = time.perf_counter()
+    expanded = pushed = 0
+    path = []
+
+    if grid.is_free(*start) and grid.is_free(*goal):
+        free, width = padded_free(grid)
+        s = (start[0] + 1) * width + start[1] + 1
+        g = (goal[0] + 1) * width + goal[1] + 1
+        gr, gc = goal[0] + 1, goal[1] + 1
+        clear = _flat_clearance(grid)
+        cols = grid.cols
+
+        def clearance(i):
+            r, c = divmod(i, width)
+            return clear[(r - 1) * cols + c - 1]
+
+        g_cost = {s: 0.0}
+        parent = {s: -1}
+        closed = set()
+        h = octile(start[0], start[1], goal[0], goal[1])
+        open_set = [(h, -clearance(s), h, s)]
+        pushed = 1
+        pop, push = heapq.heappop, heapq.heappush
+
+        while open_set:
+            _, _, _, i = pop(open_set)
+            if i in closed:
+                continue
+            closed.add(i)
+            expanded += 1
+
+            if i == g:
+                jumps = []
+                while i != -1:
+                    jumps.append(i)
+                    i = parent[i]
+                jumps.reverse()
+                path = relax_path(grid, _fill_jumps(jumps, width))
+                break
+
+            r, c = divmod(i, width)
+            p = parent[i]
+            if p == -1:
+                dr = dc = 0
+            else:
+                pr, pc = divmod(p, width)
+                dr = (r > pr) - (r < pr)
+                dc = (c > pc) - (c < pc)
+            gi = g_cost[i]
+            for ddr, ddc in _jps_directions(free, i, dr, dc, width):
+                j = _jump(free, i, ddr, ddc, width, g)
+                if j == -1 or j in closed:
+                    continue
+                jr, jc = divmod(j, width)
+                ng = gi + octile(r, c, jr, jc)
+                gj = g_cost.get(j, float("inf"))
+                if ng < gj - _TIE:
+                    g_cost[j] = ng
+                    parent[j] = i
+                    hj = octile(jr, jc, gr, gc)
+                    push(open_set, (ng + hj, -clearance(j), hj, j))
+                    pushed += 1
+
+    if stats is not None:
+        stats.expanded, stats.pushed = expanded, pushed
+        stats.seconds = time.perf_counter() - t0
+    return path
+
+
+def _fill_jumps(jumps, width):
+    """Padded jump point indices -> every (row, col) cell along the way."""
+    cells = []
+    for a, b in zip(jumps, jumps[1:]):
+        ar, ac = divmod(a, width)
+        br, bc = divmod(b, width)
+        dr = (br > ar) - (br < ar)
+        dc = (bc > ac) - (bc < ac)
+        while (ar, ac) != (br, bc):
+            cells.append((ar - 1, ac - 1))
+            ar += dr
+            ac += dc
+    r, c = divmod(jumps[-1], width)
+    cells.append((r - 1, c - 1))
+    return cells
+
+
+def relax_path(grid, cells, passes=8):
+    """
+    Shift a path away from the walls without making it longer.
+
+    Swapping two consecutive moves keeps the same steps, so the same length,
+    but moves the cell between them; each pass makes that swap wherever the
+    new cell is free and has more wall clearance. Every pass can move a
+    corner one cell further out, hence the small fixed number of passes.
+    """
+    cells = list(cells)
+    free = grid.free
+    clear = _flat_clearance(grid)
+    cols = grid.cols
+    for _ in range(passes):
+        changed = False
+        for i in range(1, len(cells) - 1):
+            (pr, pc), (cr, cc), (nr, nc) = cells[i - 1], cells[i], cells[i + 1]
+            ar, ac = pr + nr - cr, pc + nc - cc
+            j = ar * cols + ac
+            if (ar, ac) != (cr, cc) and free[j] and clear[j] > clear[cr * cols + cc]:
+                cells[i] = (ar, ac)
+                changed = True
+        if not changed:
+            break
+    return cells
+
+
+def smooth_path(grid, cells, max_span=48):
+    """
+    String-pull a cell path down to the cells where it has to turn.
+
+    From each kept cell the path jumps to the furthest later cell (at most
+    ``max_span`` cells on) whose straight line stays at least as far from
+    the walls (``wall_clearance``) as the stretch of path it replaces, so
+    the shortcut is never tighter than the original route. Candidates are
+    tested together with NumPy, one kept cell at a time.
+    """
+    n = len(cells)
+    if n < 3:
+        return list(cells)
+    clear = wall_clearance(grid)
+    pts = np.asarray(cells, dtype=np.float64)
+    idx = pts.astype(np.intp)
+    path_clear = clear[idx[:, 0], idx[:, 1]]
+    t = np.linspace(0.0, 1.0, 2 * max_span + 1)[None, :, None]
+
+    kept = [0]
+    i = 0
+    while i < n - 1:
+        js = np.arange(i + 1, min(n, i + 1 + max_span))
+        floor = np.minimum.accumulate(path_clear[i + 1:js[-1] + 1])
+        floor = np.minimum(floor, path_clear[i])
+        samples = np.rint(pts[i] + t * (pts[js] - pts[i])[:, None, :]).astype(np.intp)
+        blocked = clear[samples[..., 0], samples[..., 1]].min(axis=1) < floor
+        if not blocked.any():
+            i = int(js[-1])
+        else:
+            # Up to the last cell before the first blocked line, at least one on.
+            first = int(blocked.argmax())
+            i = int(js[first - 1] if first > 0 else js[0])
+        kept.append(i)
+    return [cells[k] for k in kept]
+
+
+class LegCache:
+    """
+    Bounded cache of finished (e.g. smoothed) paths for one grid, keyed by
+    whatever identifies a leg: typically the planner and the start and goal
+    cells. Oldest entries are dropped first.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._paths = OrderedDict()
+
+    def get(self, key):
+        return self._paths.get(key)
+
+    def put(self, key, path):
+        self._paths[key] = path
+        while len(self._paths) > self.max_entries:
+            self._paths.popitem(last=False)
+
+    def __len__(self):
+        return len(self._paths)
+
+
+_LEG_CACHES = weakref.WeakKeyDictionary()  # grid -> LegCache
+
+
+def leg_cache_for(grid):
+    """The LegCache shared by every car planning on ``grid`` (one per level)."""
+    cache = _LEG_CACHES.get(grid)
+    if cache is None:
+        cache = LegCache()
+        _LEG_CACHES[grid] = cache
+    return cache
+
+
+def nearest_free(grid, cell, max_radius=80):
+    """Closest walkable cell to ``cell`` by 4-connected BFS, or None."""
+    if grid.is_free(*cell):
+        return cell
+    rows, cols = grid.rows, grid.cols
+    free = grid.free
+    queue = [(cell[0], cell[1], 0)]
+    seen = {cell}
+    head = 0
+    while head < len(queue):
+        r, c, d = queue[head]
+        head += 1
+        if d >= max_radius:
+            break
+        for nr, nc in ((r + 1, c), (r - 1, c), (r, c + 1), (r, c - 1)):
+            if 0 <= nr < rows and 0 <= nc < cols and (nr, nc) not in seen:
+                if free[nr * cols + nc]:
+                    return (nr, nc)
+                seen.add((nr, nc))
+                queue.append((nr, nc, d + 1))
+    return None
+
+
+# --------------------------------------------------
+# Flow fields
+# --------------------------------------------------
+def cost_to_goal(grid, goal):
+    """
+    Reverse Dijkstra from ``goal``: (rows, cols) float32 cost of the cheapest
+    8-connected path from every cell to ``goal``, inf where unreachable.
+    """
+    rows, cols = grid.rows, grid.cols
+    dist_out = np.full((rows, cols), np.inf, dtype=np.float32)
+    if not grid.is_free(*goal):
+        return dist_out
+
+    # A one-cell wall border removes bounds checks from the inner loop.
+    free, width = padded_free(grid)
+    steps = [(dr * width + dc, cost) for dr, dc, cost in NEIGHBORS_8]
+
+    inf = float("inf")
+    dist = [inf] * len(free)
+    g = (goal[0] + 1) * width + goal[1] + 1
+    dist[g] = 0.0
+    heap = [(0.0, g)]
+    pop, push = heapq.heappop, heapq.heappush
+    while heap:
+        d, i = pop(heap)
+        if d > dist[i]:
+            continue
+        for off, cost in steps:
+            j = i + off
+            if free[j]:
+                nd = d + cost
+                if nd < dist[j]:
+                    dist[j] = nd
+                    push(heap, (nd, j))
+
+    dist_out[:] = np.array(dist, dtype=np.float32).reshape(rows + 2, width)[1:-1, 1:-1]
+    return dist_out
+
+
+def descend(field, start, goal, clearance=None):
+    """
+    Follow ``field`` downhill from ``start`` to ``goal``. Each step moves to
+    the neighbour with the lowest cost-to-goal plus step cost, which is the
+    next cell of an optimal path. Among equally good neighbours the one with
+    the most ``clearance`` (if given) wins, keeping the path off the walls.
+    Returns cells start..goal, or [] if ``start`` cannot reach the goal.
+    """
+    rows, cols = field.shape
+    r, c = start
+    if not (0 <= r < rows and 0 <= c < cols) or not np.isfinite(field[r, c]):
+        return []
+
+    path = [start]
+    here = float(field[r, c])
+    while (r, c) != goal:
+        best = None
+        best_total = float("inf")
+        best_clear = -1.0
+        for dr, dc, cost in NEIGHBORS_8:
+            nr, nc = r + dr, c + dc
+            if not (0 <= nr < rows and 0 <= nc < cols):
+                continue
+            value = float(field[nr, nc])
+            # Strictly downhill, so the walk always terminates.
+            if value >= here:
+                continue
+            total = value + cost
+            clear = float(clearance[nr, nc]) if clearance is not None else 0.0
+            if total < best_total - _TIE or (total < best_total + _TIE and clear > best_clear):
+                best, best_total, best_value, best_clear = (nr, nc), total, value, clear
+        if best is None:
+            return []
+        r, c = best
+        here = best_value
+        path.append(best)
+    return path
+
+
+class FlowFields:
+    """
+    Cost-to-goal fields for one grid, one per goal cell. A field is computed
+    the first time its goal is asked for, or taken from a compiled track
+    package. Any number of cars can then extract paths to that goal.
+    The grid is passed in on each call rather than kept, so the fields are
+    dropped along with the grid (see flow_fields_for).
+    """
+
+    def __init__(self):
+        self._fields = {}       # goal cell -> float32 field
+        self._precomputed = {}  # goal cell -> zero-argument loader
+        self._queued = set()    # goal cells submitted by warm_async, not yet built
+
+    def add_precomputed(self, loaders):
+        self._precomputed.update(loaders)
+
+    def has(self, goal):
+        return goal in self._fields
+
+    def field(self, grid, goal):
+        field = self._fields.get(goal)
+        if field is None:
+            loader = self._precomputed.get(goal)
+            field = loader() if loader is not None else cost_to_goal(grid, goal)
+            self._fields[goal] = field
+        return field
+
+    def path(self, grid, start, goal):
+        """Cells from ``start`` to ``goal`` inclusive, [] if unreachable."""
+        if not grid.is_free(*start) or not grid.is_free(*goal):
+            return []
+        return descend(self.field(grid, goal), start, goal, wall_clearance(grid))
+
+    def warm(self, grid, goals, budget_sec=0.0):
+        """
+        Build fields for ``goals`` on this thread until ``budget_sec`` is
+        spent; none are built once it is. A build is never split, so one may
+        run past the budget. Returns how many are still missing.
+        """
+        deadline = time.perf_counter() + budget_sec
+        missing = [g for g in dict.fromkeys(goals) if g not in self._fields]
+        for i, goal in enumerate(missing):
+            if time.perf_counter() >= deadline:
+                return len(missing) - i
+            self.field(grid, goal)
+        return 0
+
+    def warm_async(self, grid, goals, service):
+        """
+        Queue builds of the missing fields for ``goals`` on a PlannerService,
+        each goal once, so they are made within its per-frame budget rather
+        than on this frame. Paths asked for before a field is ready still
+        build it on demand. Returns how many are still missing.
+        """
+        grid_ref = weakref.ref(grid)
+        missing = 0
+        for goal in dict.fromkeys(goals):
+            if goal in self._fields:
+                continue
+            missing += 1
+            if goal not in self._queued:
+                self._queued.add(goal)
+                service.submit(None, self._build, grid_ref, goal)
+        return missing
+
+    def _build(self, grid_ref, goal):
+        # Runs on the planner; holds only a weak reference to the grid so a
+        # queued build does not keep a finished level alive.
+        grid = grid_ref()
+        try:
+            if grid is not None:
+                self.field(grid, goal)
+        finally:
+            self._queued.discard(goal)
+
+
+_FLOW_FIELDS = weakref.WeakKeyDictionary()  # grid -> FlowFields
+
+
+def flow_fields_for(grid):
+    """The FlowFields shared by everything planning on ``grid``."""
+    fields = _FLOW_FIELDS.get(grid)
+    if fields is None:
+        fields = FlowFields()
+        _FLOW_FIELDS[grid] = fields
+    return fields
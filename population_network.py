@@ -0,0 +1,145 @@
+"""
+Whole-population network evaluation.
+
+``PopulationNetwork.create(nets)`` packs the feed-forward networks of a
+generation into padded NumPy tensors, one set per layer, and ``activate``
+evaluates every network in one call: ``outputs[N, 2] = f(inputs[N, 6])``.
+
+Every network value lives in a slot of one (N, slots) array: the inputs
+first, then a slot that is always zero, then each layer's nodes. A layer
+holds, per network and node, the slots its links read from and their
+weights, padded to the layer's widest node with links to the zero slot
+of weight 0. Links are summed in the order FeedForwardNetwork.activate sums
+them, so a network's outputs don't depend on which others share its batch.
+They match activate() to within rounding of the NumPy activation functions.
+
+Only networks whose nodes all use the sum aggregation and an activation in
+ACTIVATIONS can be packed; ``create`` returns None otherwise.
+"""
+
+import numpy as np
+
+from neat import aggregations
+from neat.nn.vectorized import ACTIVATIONS  # NumPy versions of neat's activations, clamps included
+
+
+class _Layer:
+    """Padded tensors of one layer: (N, width, fan_in) links, (N, width) nodes."""
+    __slots__ = ("offset", "src", "weight", "bias", "response", "act", "act_funcs")
+
+    def __init__(self, offset, n, width, fan_in):
+        self.offset = offset                               # first value slot of this layer
+        self.src = np.zeros((n, width, fan_in), dtype=np.intp)
+        self.weight = np.zeros((n, width, fan_in))
+        self.bias = np.zeros((n, width))
+        self.response = np.zeros((n, width))
+        self.act = np.zeros((n, width), dtype=np.intp)     # index into act_funcs
+        self.act_funcs = []
+
+
+class PopulationNetwork:
+    """N feed-forward networks evaluated together (see module docstring)."""
+
+    def __init__(self, num_inputs, slots, layers, out_src):
+        self.num_inputs = num_inputs
+        self.slots = slots
+        self.layers = layers
+        self.out_src = out_src  # (N, outputs) slot of each output node
+
+    def __len__(self):
+        return len(self.out_src)
+
+    @classmethod
+    def create(cls, nets):
+        """Pack FeedForwardNetworks that share input/output keys, or None if one can't be."""
+        if not nets:
+            return None
+        input_keys = nets[0].input_nodes
+        output_keys = nets[0].output_nodes
+        zero = len(input_keys)
+
+        # Layer each network: a node sits one past the deepest node it reads.
+        depths = []
+        for net in nets:
+            if net.input_nodes != input_keys or net.output_nodes != output_keys:
+                return None
+            depth = {key: -1 for key in input_keys}
+            for node, act_func, agg_func, bias, response, links in net.node_evals:
+                if agg_func is not aggregations.sum_aggregation or act_func not in ACTIVATIONS:
+                    return None
+                depth[node] = 1 + max((depth[i] for i, w in links), default=-1)
+            depths.append(depth)
+
+        n_layers = 1 + max((d for depth in depths for d in depth.values()), default=-1)
+        widths = [0] * n_layers
+        fan_ins = [0] * n_layers
+        for net, depth in zip(nets, depths):
+            count = [0] * n_layers
+            for node, _, _, _, _, links in net.node_evals:
+                d = depth[node]
+                count[d] += 1
+                fan_ins[d] = max(fan_ins[d], len(links))
+            widths = [max(a, b) for a, b in zip(widths, count)]
+
+        offset = zero + 1
+        layers = []
+        for width, fan_in in zip(widths, fan_ins):
+            layers.append(_Layer(offset, len(nets), width, fan_in))
+            offset += width
+        for layer in layers:
+            layer.src.fill(zero)
+
+        out_src = np.full((len(nets), len(output_keys)), zero, dtype=np.intp)
+        for row, (net, depth) in enumerate(zip(nets, depths)):
+            slot = {key: i for i, key in enumerate(input_keys)}
+            count = [0] * n_layers
+            for node, act_func, _, bias, response, links in net.node_evals:
+                layer = layers[depth[node]]
+                col = count[depth[node]]
+                count[depth[node]] += 1
+                slot[node] = layer.offset + col
+                for k, (i, w) in enumerate(links):
+                    layer.src[row, col, k] = slot[i]
+                    layer.weight[row, col, k] = w
+                layer.bias[row, col] = bias
+                layer.response[row, col] = response
+                if act_func not in layer.act_funcs:
+                    layer.act_funcs.append(act_func)
+                layer.act[row, col] = layer.act_funcs.index(act_func)
+            for j, key in enumerate(output_keys):
+                if key in slot:
+                    out_src[row, j] = slot[key]
+
+        return cls(len(input_keys), offset, layers, out_src)
+
+    def activate(self, inputs, rows=None):
+        """
+        Outputs (len(rows), outputs) of the networks at ``rows`` (default:
+        all of them) for their ``inputs`` (len(rows), num_inputs).
+        """
+        inputs = np.asarray(inputs, dtype=float)
+        if rows is None:
+            rows = np.arange(len(self))
+        n = len(rows)
+        values = np.zeros((n, self.slots))
+        values[:, :self.num_inputs] = inputs
+        at = np.arange(n)[:, None, None]
+
+        for layer in self.layers:
+            src, weight = layer.src[rows], layer.weight[rows]
+            linked = values[at, src]
+            # Add the links up one at a time, in the order activate() does.
+            s = np.zeros(src.shape[:2])
+            for k in range(src.shape[2]):
+                s = s + linked[:, :, k] * weight[:, :, k]
+            z = layer.bias[rows] + layer.response[rows] * s
+            if len(layer.act_funcs) == 1:
+                out = ACTIVATIONS[layer.act_funcs[0]](z)
+            else:
+                act = layer.act[rows]
+                out = np.zeros_like(z)
+                for i, func in enumerate(layer.act_funcs):
+                    out = np.where(act == i, ACTIVATIONS[func](z), out)
+            values[:, layer.offset:layer.offset + src.shape[1]] = out
+
+        return values[np.arange(n)[:, None], self.out_src[rows]]
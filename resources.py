@@ -1,17 +1,33 @@
 # resources.py
 
+import os
 import pygame
-import time
 import math
+import struct
+from collections import OrderedDict
+
+from asset_registry import AssetRegistry, LazyAssetMap
+from planning import flow_fields_for
+from sim_clock import SimClock
+from sprite_atlas import atlas_for
+from track_fields import (DISTANCE_FIELD_CAP, OccupancyGrid, clearance_map, distance_field,
+                          mask_to_array, raycast_field)
+from track_package import TrackPackage, file_digest
 
 # --------------------------------------------------
 # Pygame Init (ONCE)
 # --------------------------------------------------
-pygame.init()
+# DFA_HEADLESS=1 skips display, font and audio init entirely: no window, no
+# WIN surface, no music. Tracks, masks, grids, cars and NEATManager still work,
+# so training and benchmarks run on machines without SDL video/audio.
+HEADLESS = os.environ.get("DFA_HEADLESS", "").lower() not in ("", "0", "false", "no")
+
+if not HEADLESS:
+    pygame.init()
 
-pygame.font.init()
-pygame.mixer.pre_init(44100, -16, 2, 512)
-pygame.mixer.init()
+    pygame.font.init()
+    pygame.mixer.pre_init(44100, -16, 2, 512)
+    pygame.mixer.init()
 
 # --------------------------------------------------
 # Helpers
@@ -31,7 +47,8 @@ def blit_text_center(win, font, text, color=(255, 0, 0)):
     )
 
 def blit_rotate_center(win, image, top_left, angle):
-    rotated_image = pygame.transform.rotate(image, angle)
+    # Pre-rotated, 1-degree steps: see sprite_atlas.py
+    rotated_image = atlas_for(image).rotated(angle)
     new_rect = rotated_image.get_rect(
         center=image.get_rect(topleft=top_left).center
     )
@@ -41,56 +58,283 @@ def blit_rotate_center(win, image, top_left, angle):
 # Constants
 # --------------------------------------------------
 FPS = 60
+SIM_CLOCK = SimClock(FPS)  # fixed-step clock the race and NEAT training advance on
 GRID_SIZE = 4
 CHECKPOINT_RADIUS = 45 # Increased by 5 pixels for easier checkpoint detection
 DEBUG_SHOW_CHECKPOINTS = False  # Set to True to show red checkpoint dots and pathfinding visualization
 DEBUG_DRAW_POINTS = False # Enables drawing and plotting of points on levels during them being played
 DEBUG_UNLOCK_ALL_LEVELS = False  # Set to True to unlock all levels for testing/debugging
+RAYCAST_MODE = "sdf"  # "sdf" sphere-traces TRACK_DISTANCE_FIELD; "march" samples the mask every `step` pixels
 
 SOUND_ENABLED = True
 MUSIC_VOLUME = 0.1
 SFX_VOLUME = 0.7
 
 # --------------------------------------------------
-# Static assets
+# Static assets (lazy)
 # --------------------------------------------------
-MENU = scale_image(pygame.image.load("assets/Menu.png"), 0.90)
-MENU2 = scale_image(pygame.image.load("assets/Menu2.png"), 0.90)
-MENU3 = scale_image(pygame.image.load("assets/Menu3.png"), 0.90)
-MENU4 = scale_image(pygame.image.load("assets/Menu4.png"), 0.90)
-
-BLUE_CAR = scale_image(pygame.image.load("assets/blue-car.png"), 0.55)
-RED_CAR = scale_image(pygame.image.load("assets/red-car.png"), 0.55)
-GREEN_CAR = scale_image(pygame.image.load("assets/green-car.png"), 0.55)
-PURPLE_CAR = scale_image(pygame.image.load("assets/purple-car.png"), 0.55)
-WHITE_CAR = scale_image(pygame.image.load("assets/white-car.png"), 0.55)
-TEMPLATE_CAR = scale_image(pygame.image.load("assets/car_template.png"), 0.55)
-GREY_CAR = scale_image(pygame.image.load("assets/grey-car.png"), 0.55)
-PINK_CAR = scale_image(pygame.image.load("assets/pink-car.png"), 0.55)
-YELLOW_CAR = scale_image(pygame.image.load("assets/yellow-car.png"), 0.55)
+# Images and sounds load on first access (``resources.MENU``), not at import.
+# preload_assets() warms the rest a few milliseconds per frame from the menu.
+ASSETS = AssetRegistry()
+
+def _register_image(name, path, factor):
+    ASSETS.register(name, lambda: scale_image(pygame.image.load(path), factor))
+
+_register_image("MENU", "assets/Menu.png", 0.90)
+_register_image("MENU2", "assets/Menu2.png", 0.90)
+_register_image("MENU3", "assets/Menu3.png", 0.90)
+_register_image("MENU4", "assets/Menu4.png", 0.90)
+
+_register_image("BLUE_CAR", "assets/blue-car.png", 0.55)
+_register_image("RED_CAR", "assets/red-car.png", 0.55)
+_register_image("GREEN_CAR", "assets/green-car.png", 0.55)
+_register_image("PURPLE_CAR", "assets/purple-car.png", 0.55)
+_register_image("WHITE_CAR", "assets/white-car.png", 0.55)
+_register_image("TEMPLATE_CAR", "assets/car_template.png", 0.55)
+_register_image("GREY_CAR", "assets/grey-car.png", 0.55)
+_register_image("PINK_CAR", "assets/pink-car.png", 0.55)
+_register_image("YELLOW_CAR", "assets/yellow-car.png", 0.55)
 
 # Color name to car image mapping
-CAR_COLOR_MAP = {
-    "Red": RED_CAR,
-    "Blue": BLUE_CAR,
-    "Green": GREEN_CAR,
-    "Purple": PURPLE_CAR,
-    "White": WHITE_CAR,
-    "Grey": GREY_CAR,
-    "Pink": PINK_CAR,
-    "Yellow": YELLOW_CAR,
+CAR_COLOR_MAP = LazyAssetMap(ASSETS, {
+    "Red": "RED_CAR",
+    "Blue": "BLUE_CAR",
+    "Green": "GREEN_CAR",
+    "Purple": "PURPLE_CAR",
+    "White": "WHITE_CAR",
+    "Grey": "GREY_CAR",
+    "Pink": "PINK_CAR",
+    "Yellow": "YELLOW_CAR",
+})
+
+def get_car_image(color, default):
+    """Sprite for `color`, or the `default` color's sprite for unknown names."""
+    image = CAR_COLOR_MAP.get(color)
+    return image if image is not None else CAR_COLOR_MAP[default]
+
+# --------------------------------------------------
+# Grid
+# --------------------------------------------------
+def build_grid(mask):
+    """Sample the border mask every GRID_SIZE pixels; True cells are drivable."""
+    return OccupancyGrid.from_mask(mask, GRID_SIZE)
+
+# --------------------------------------------------
+# Level Definitions
+# --------------------------------------------------
+_LEVEL1_PATH = [
+    (191,131),(138,50),(70,110),(50,530),(317,800),(397,811),
+    (450,753),(457,586),(559,515),(665,596),(670,775),
+    (745,850),(840,746),(840,450),(730,400),(475,410),
+    (425,347),(500,250),(763,282),(840,238),(840,130),
+    (749,45),(363,45),(316,150),(310,405),(255,460),
+    (178,404),(193,193)
+]
+
+_LEVEL2_PATH = [
+    (73, 134), (132, 54), (262, 42), (412, 46), (669, 45), (766, 50),
+    (861, 132), (816, 238), (725, 467), (753, 582), (821, 746), (707, 820),
+    (346, 838), (70, 820), (66, 741), (93, 694), (220, 632), (486, 527),
+    (511, 416), (366, 391), (230, 480), (119, 470), (47, 387),
+]
+
+_LEVEL2_DFS_PLAYER_ALT_PATH = [
+    (69, 140), (162, 52), (424, 39), (705, 40), (853, 105), (823, 237),
+    (726, 471), (754, 586), (841, 730), (749, 799), (641, 700), (637, 478),
+    (644, 285), (529, 199), (344, 196), (254, 260), (226, 359), (224, 476),
+    (132, 489), (66, 396),
+]
+
+_LEVEL3_PATH = [
+    (442, 108), (486, 48), (661, 49), (795, 75), (842, 108), (849, 200),
+    (764, 248), (620, 252), (589, 302), (587, 389), (792, 398), (859, 443),
+    (855, 654), (842, 773), (708, 781), (661, 712), (655, 627), (610, 582),
+    (541, 578), (473, 581), (443, 535), (445, 425),
+]
+
+_LEVEL3_ALT_PATH = [
+    (444, 235), (323, 227), (284, 189), (277, 101), (231, 43), (96, 49),
+    (56, 103), (52, 281), (122, 316), (239, 356), (231, 430), (178, 472),
+    (97, 473), (48, 520), (47, 685), (122, 783), (312, 804), (477, 819),
+    (654, 818), (653, 628), (608, 581), (482, 577), (443, 535), (444, 425),
+]
+
+_LEVEL4_PATH = [
+    (318, 157), (359, 116), (472, 115), (535, 62), (653, 59), (637, 194),
+    (589, 234), (489, 245), (455, 300), (459, 377), (578, 388), (589, 490),
+    (632, 528), (763, 532), (765, 781), (719, 833), (499, 832), (195, 827),
+    (139, 783), (157, 578), (61, 493), (67, 352), (190, 350), (284, 354),
+    (323, 247),
+]
+
+_LEVEL4_GBFS_PLAYER_ALT_PATH = [
+    (321, 152), (358, 117), (473, 115), (531, 64), (652, 55), (639, 191),
+    (593, 236), (488, 249), (454, 307), (459, 372), (443, 435), (407, 469),
+    (315, 477), (275, 509), (272, 587), (326, 651), (453, 654), (512, 701),
+    (515, 834), (199, 824), (136, 782), (153, 585), (64, 494), (66, 349),
+    (186, 350), (281, 353), (320, 246),
+]
+
+# Everything load_track_for_level needs to know about a level, besides the
+# pixels themselves. Racing lines not listed fall back to "racing_line".
+LEVEL_DEFINITIONS = {
+    1: {
+        "background": "assets/green.jpg",
+        "background_scale": 1.5,
+        "track": "assets/track1.png",
+        "border": "assets/track_border1.png",
+        "finish_position": (135, 280),
+        "start_position": (200, 200),
+        "racing_line": _LEVEL1_PATH,
+    },
+    2: {
+        "background": "assets/yellow.png",
+        "background_scale": 1,
+        "track": "assets/track2.png",
+        "border": "assets/track_border2.png",
+        "finish_position": (30, 420),
+        "start_position": (70, 288),
+        "racing_line": _LEVEL2_PATH,
+        "level2_dfs_player_alt_racing_line": _LEVEL2_DFS_PLAYER_ALT_PATH,
+    },
+    3: {
+        "background": "assets/orange.jpg",
+        "background_scale": 1,
+        "track": "assets/track3.png",
+        "border": "assets/track_border3.png",
+        "finish_position": (395, 435),
+        "start_position": (440, 350),
+        "racing_line": _LEVEL3_PATH,
+        "dfs_racing_line": _LEVEL3_ALT_PATH,
+        "bfs_racing_line": _LEVEL3_ALT_PATH,
+    },
+    4: {
+        "background": "assets/red.jpg",
+        "background_scale": 1.5,
+        "track": "assets/track4.png",
+        "border": "assets/track_border4.png",
+        "finish_position": (270, 265),
+        "start_position": (320, 180),
+        "racing_line": _LEVEL4_PATH,
+        "level4_gbfs_player_alt_racing_line": _LEVEL4_GBFS_PLAYER_ALT_PATH,
+    },
 }
 
+# --------------------------------------------------
+# Level Asset Cache
+# --------------------------------------------------
+LEVEL_CACHE_SIZE = 2  # Levels kept decoded in memory (least recently used is dropped first)
+TRACK_PACKAGE_DIR = "assets/compiled"  # Output of compile_track.py
+
+def track_package_path(level, directory=None):
+    return os.path.join(directory or TRACK_PACKAGE_DIR, f"track{level}.bin")
+
+def load_track_package(level):
+    """
+    The compiled package for `level`, or None if there isn't a usable one.
+    Packages built from a different border PNG or with other grid settings
+    are ignored, so a stale package can never change the track.
+    """
+    path = track_package_path(level)
+    if not os.path.exists(path):
+        return None
+    try:
+        package = TrackPackage(path)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring track package {path}: {e}")
+        return None
+    meta = package.meta
+    if (meta.get("grid_size") != GRID_SIZE
+            or meta.get("distance_cap") != DISTANCE_FIELD_CAP
+            or meta.get("border_sha1") != file_digest(LEVEL_DEFINITIONS[level]["border"])):
+        return None
+    return package
+
+class LevelAssets:
+    """Decoded surfaces, border mask and derived track data for one level."""
+    __slots__ = ("level", "background", "track", "track_border", "track_border_mask",
+                 "grid", "distance_field", "clearance", "package", "converted")
+
+    def __init__(self, level):
+        definition = LEVEL_DEFINITIONS[level]
+        self.level = level
+        track_border = pygame.image.load(definition["border"])
+        self.track_border_mask = pygame.mask.from_surface(track_border)
+        self.package = load_track_package(level)
+        if self.package is not None:
+            # Precompiled by compile_track.py: the distance field stays mapped.
+            self.grid = OccupancyGrid(self.package.occupancy(), GRID_SIZE)
+            self.distance_field = self.package.distance_field()
+            self.clearance = self.package.clearance()
+            flow_fields_for(self.grid).add_precomputed(self.package.flow_field_loaders())
+        else:
+            walls = mask_to_array(self.track_border_mask)
+            self.grid = build_grid(self.track_border_mask)
+            self.distance_field = distance_field(walls)
+            self.clearance = clearance_map(walls, GRID_SIZE)
+        if HEADLESS:
+            # Nothing is drawn, so only the border is decoded (for its mask).
+            self.background = self.track = self.track_border = None
+        else:
+            self.background = scale_image(pygame.image.load(definition["background"]),
+                                          definition["background_scale"])
+            self.track = pygame.image.load(definition["track"])
+            self.track_border = track_border
+        self.converted = False
+
+    def convert(self):
+        """Convert surfaces to the display's pixel format once a display exists."""
+        if self.converted or pygame.display.get_surface() is None:
+            return
+        self.background = self.background.convert()
+        self.track = self.track.convert_alpha()
+        self.track_border = self.track_border.convert_alpha()
+        self.converted = True
+
+_LEVEL_CACHE = OrderedDict()  # level -> LevelAssets, most recently used last
+
+def get_level_assets(level):
+    """Return the LevelAssets for `level`, decoding it only on a cache miss."""
+    if level not in LEVEL_DEFINITIONS:
+        raise ValueError(f"Unknown level: {level}")
+
+    assets = _LEVEL_CACHE.get(level)
+    if assets is None:
+        assets = LevelAssets(level)
+        _LEVEL_CACHE[level] = assets
+    _LEVEL_CACHE.move_to_end(level)
+
+    while len(_LEVEL_CACHE) > max(1, LEVEL_CACHE_SIZE):
+        _LEVEL_CACHE.popitem(last=False)
+
+    assets.convert()
+    return assets
+
+def preload_levels(levels):
+    """Decode `levels` ahead of time. Only the last LEVEL_CACHE_SIZE stay resident."""
+    for level in levels:
+        get_level_assets(level)
+
+def clear_level_cache():
+    _LEVEL_CACHE.clear()
+
 # --------------------------------------------------
 # Default Track (Level 1)
 # --------------------------------------------------
-BACKGROUND = scale_image(pygame.image.load("assets/green.jpg"), 1.5)
-TRACK = scale_image(pygame.image.load("assets/track1.png"), 1)
-TRACK_BORDER = scale_image(pygame.image.load("assets/track_border1.png"), 1)
-TRACK_BORDER_MASK = pygame.mask.from_surface(TRACK_BORDER)
+# BACKGROUND, TRACK, TRACK_BORDER, TRACK_BORDER_MASK, GRID,
+# TRACK_DISTANCE_FIELD and TRACK_CLEARANCE are only bound once a track is in
+# use: the first read of any of them (see __getattr__ below) decodes level 1,
+# as import used to.
+_TRACK_GLOBALS = ("BACKGROUND", "TRACK", "TRACK_BORDER", "TRACK_BORDER_MASK",
+                  "GRID", "TRACK_DISTANCE_FIELD", "TRACK_CLEARANCE")
+_CURRENT_LEVEL = None  # LevelAssets behind the track globals
 
-FINISH = pygame.image.load("assets/finish.png")
-FINISH_MASK = pygame.mask.from_surface(FINISH)
+def _load_image_alpha(path):
+    image = pygame.image.load(path)
+    return image.convert_alpha() if pygame.display.get_surface() is not None else image
+
+ASSETS.register("FINISH", lambda: _load_image_alpha("assets/finish.png"))
+ASSETS.register("FINISH_MASK", lambda: pygame.mask.from_surface(ASSETS.get("FINISH")))
 
 FINISH_POSITION = (135, 250)
 START_POSITION = (200, 200)
@@ -114,8 +358,14 @@ update_spawn_positions()
 FINISH_LEVEL3 = None
 FINISH_MASK_LEVEL3 = None
 
-HEIGHT, WIDTH = TRACK.get_size()
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
+def _png_size(path):
+    """(width, height) from a PNG header, without decoding the image."""
+    with open(path, "rb") as f:
+        header = f.read(24)
+    return struct.unpack(">II", header[16:24])
+
+WIDTH, HEIGHT = _png_size(LEVEL_DEFINITIONS[1]["track"])
+WIN = None if HEADLESS else pygame.display.set_mode((WIDTH, HEIGHT))
 
 RACING_LINE = []
 DFS_RACING_LINE = []
@@ -132,59 +382,94 @@ HIGHEST_LEVEL = 1 # This is updated during gameplay - initially set to 1 - repre
 # --------------------------------------------------
 # TODO: Ensure these images exist and are up to date
 
-LEVEL_PREVIEWS = {
-    1: pygame.image.load("assets/track1.png").convert_alpha(),
-    2: pygame.image.load("assets/track2.png").convert_alpha(),
-    3: pygame.image.load("assets/track3.png").convert_alpha(),
-    4: pygame.image.load("assets/track4.png").convert_alpha(),
-}   
+def _register_preview(level):
+    path = LEVEL_DEFINITIONS[level]["track"]
+    ASSETS.register(
+        f"LEVEL_PREVIEW_{level}",
+        lambda: pygame.transform.smoothscale(_load_image_alpha(path), (290, 290)),
+    )
+
+for _level in LEVEL_DEFINITIONS:
+    _register_preview(_level)
 
-for k, img in LEVEL_PREVIEWS.items():
-    LEVEL_PREVIEWS[k] = pygame.transform.smoothscale(img, (290, 290))
+LEVEL_PREVIEWS = LazyAssetMap(ASSETS, {level: f"LEVEL_PREVIEW_{level}" for level in LEVEL_DEFINITIONS})
 
 
 # --------------------------------------------------
 # Sounds
 # --------------------------------------------------
-pygame.mixer.music.load("assets/menu-music.ogg")
-pygame.mixer.music.set_volume(MUSIC_VOLUME)
-pygame.mixer.music.play(-1)
+if not HEADLESS:
+    pygame.mixer.music.load("assets/menu-music.ogg")
+    pygame.mixer.music.set_volume(MUSIC_VOLUME)
+    pygame.mixer.music.play(-1)
+
+def _load_click_sound():
+    sound = pygame.mixer.Sound("assets/select-sound.ogg")
+    sound.set_volume(SFX_VOLUME if SOUND_ENABLED else 0.0)
+    return sound
 
-click_sound = pygame.mixer.Sound("assets/select-sound.ogg")
-click_sound.set_volume(SFX_VOLUME)
+if not HEADLESS:
+    ASSETS.register("click_sound", _load_click_sound)
 
 def set_sound_enabled(enabled: bool):
     global SOUND_ENABLED
     SOUND_ENABLED = bool(enabled)
+    if not pygame.mixer.get_init():
+        return
     pygame.mixer.music.set_volume(MUSIC_VOLUME if SOUND_ENABLED else 0.0)
-    click_sound.set_volume(SFX_VOLUME if SOUND_ENABLED else 0.0)
+    if ASSETS.is_loaded("click_sound"):
+        ASSETS.get("click_sound").set_volume(SFX_VOLUME if SOUND_ENABLED else 0.0)
 
 set_sound_enabled(SOUND_ENABLED)
 
 # --------------------------------------------------
-# Grid
+# Rendering stack
 # --------------------------------------------------
-def build_grid(mask):
-    width, height = mask.get_size()
-    grid = []
-    for y in range(0, height, GRID_SIZE):
-        row = []
-        for x in range(0, width, GRID_SIZE):
-            row.append(mask.get_at((x, y)) == 0)
-        grid.append(row)
-    return grid
-
-GRID = build_grid(TRACK_BORDER_MASK)
+images = []  # filled in when a track is first used
 
 # --------------------------------------------------
-# Rendering stack
+# Lazy access
 # --------------------------------------------------
-images = [
-    (BACKGROUND, (0, 0)),
-    (TRACK, (0, 0)),
-    (FINISH, FINISH_POSITION),
-    (TRACK_BORDER, (0, 0)),
-]
+def _use_level_assets(assets):
+    """Bind the track globals and the rendering stack to `assets`."""
+    global BACKGROUND, TRACK, TRACK_BORDER, TRACK_BORDER_MASK, GRID, TRACK_DISTANCE_FIELD
+    global TRACK_CLEARANCE, _CURRENT_LEVEL
+
+    _CURRENT_LEVEL = assets
+    BACKGROUND = assets.background
+    TRACK = assets.track
+    TRACK_BORDER = assets.track_border
+    TRACK_BORDER_MASK = assets.track_border_mask
+    GRID = assets.grid
+    TRACK_DISTANCE_FIELD = assets.distance_field
+    TRACK_CLEARANCE = assets.clearance
+
+    if HEADLESS:
+        return
+    images[:] = [
+        (BACKGROUND, (0, 0)),
+        (TRACK, (0, 0)),
+        (ASSETS.get("FINISH"), FINISH_POSITION),
+        (TRACK_BORDER, (0, 0)),
+    ]
+
+def _ensure_track():
+    """Fall back to the level 1 track if no level has been loaded yet."""
+    if _CURRENT_LEVEL is None:
+        _use_level_assets(get_level_assets(1))
+
+def preload_assets(budget_sec=0.004):
+    """Load lazily registered assets for up to `budget_sec`. Returns how many are left."""
+    return ASSETS.preload_step(budget_sec)
+
+def __getattr__(name):
+    # Only reached for names not bound in the module yet.
+    if name in ASSETS:
+        return ASSETS.get(name)
+    if name in _TRACK_GLOBALS:
+        _ensure_track()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --------------------------------------------------
 # Algorithm Speed Tuning (Level-Specific)
@@ -198,6 +483,7 @@ SPEED_MULTIPLIER_CONFIG = {
         "BFS": 0.92,
         "GBFS": 0.92,
         "AStar": 0.92,
+        "JPS": 0.92,
         "Dijkstra": 0.92,
         "NEAT": 0.92,
     },
@@ -207,12 +493,14 @@ SPEED_MULTIPLIER_CONFIG = {
         "DFS": 0.8,
         "GBFS": 0.8,
         "AStar": 0.92,
+        "JPS": 0.92,
         "Dijkstra": 0.92,
         "NEAT": 0.92,
     },
     3: {
         "Player": 1.00,
         "AStar": 1.06,
+        "JPS": 1.06,
         "Dijkstra": 1.06,
         "BFS": 0.92,
         "DFS": 0.92,
@@ -225,6 +513,7 @@ SPEED_MULTIPLIER_CONFIG = {
         "BFS": 0.92,
         "DFS": 0.92,
         "AStar": 0.92,
+        "JPS": 0.92,
         "Dijkstra": 0.92,
         "NEAT": 0.92,
     },
@@ -257,165 +546,27 @@ def apply_level_speed_tuning(car, algorithm, level):
 # --------------------------------------------------
 
 def load_track_for_level(level):
-    global BACKGROUND
-    global TRACK, TRACK_BORDER, TRACK_BORDER_MASK
+    """Make `level` the current track. Decoded assets come from the level cache."""
     global FINISH_POSITION, START_POSITION
-    global RACING_LINE, GRID, images
+    global RACING_LINE
     global DFS_RACING_LINE, BFS_RACING_LINE, ASTAR_RACING_LINE, GBFS_RACING_LINE
     global LEVEL2_DFS_PLAYER_ALT_RACING_LINE, LEVEL4_GBFS_PLAYER_ALT_RACING_LINE
 
-    def compute_path_length(path):
-        total = 0.0
-        for i in range(len(path) - 1):
-            x1, y1 = path[i]
-            x2, y2 = path[i + 1]
-            total += math.hypot(x2 - x1, y2 - y1)
-        return total
-
-    LEVEL2_DFS_PLAYER_ALT_RACING_LINE = []
-    LEVEL4_GBFS_PLAYER_ALT_RACING_LINE = []
-
-    if level == 1:
-
-        background_img = "assets/green.jpg"
-        background_img = scale_image(pygame.image.load(background_img), 1.5)
-        
-        track_img = "assets/track1.png"
-        border_img = "assets/track_border1.png"
-
-        FINISH_POSITION = (135, 280)
-        START_POSITION = (200, 200)
-
-        RACING_LINE = [
-            (191,131),(138,50),(70,110),(50,530),(317,800),(397,811),
-            (450,753),(457,586),(559,515),(665,596),(670,775),
-            (745,850),(840,746),(840,450),(730,400),(475,410),
-            (425,347),(500,250),(763,282),(840,238),(840,130),
-            (749,45),(363,45),(316,150),(310,405),(255,460),
-            (178,404),(193,193)
-        ]
-
-        DFS_RACING_LINE = RACING_LINE
-        BFS_RACING_LINE = RACING_LINE
-        ASTAR_RACING_LINE = RACING_LINE
-        GBFS_RACING_LINE = RACING_LINE
-
-
-    elif level == 2:
-        background_img = "assets/yellow.png"
-        background_img = scale_image(pygame.image.load(background_img), 1)
-
-        track_img = "assets/track2.png"
-        border_img = "assets/track_border2.png"
-
-        FINISH_POSITION = (30, 420)
-        START_POSITION = (70, 288)
-
-        level2_path = [
-            (73, 134), (132, 54), (262, 42), (412, 46), (669, 45), (766, 50),
-            (861, 132), (816, 238), (725, 467), (753, 582), (821, 746), (707, 820),
-            (346, 838), (70, 820), (66, 741), (93, 694), (220, 632), (486, 527),
-            (511, 416), (366, 391), (230, 480), (119, 470), (47, 387),
-        ]
-
-        LEVEL2_DFS_PLAYER_ALT_RACING_LINE = [
-            (69, 140), (162, 52), (424, 39), (705, 40), (853, 105), (823, 237),
-            (726, 471), (754, 586), (841, 730), (749, 799), (641, 700), (637, 478),
-            (644, 285), (529, 199), (344, 196), (254, 260), (226, 359), (224, 476),
-            (132, 489), (66, 396),
-        ]
-
-        RACING_LINE = level2_path
-        DFS_RACING_LINE = level2_path
-        BFS_RACING_LINE = level2_path
-        ASTAR_RACING_LINE = level2_path
-        GBFS_RACING_LINE = level2_path
-
-
-    elif level == 3:
-        background_img = "assets/orange.jpg"
-        background_img = scale_image(pygame.image.load(background_img), 1)
-
-        track_img = "assets/track3.png"
-        border_img = "assets/track_border3.png"
-
-        FINISH_POSITION = (395, 435)
-        START_POSITION = (440, 350)
-
-        level3_path = [
-            (442, 108), (486, 48), (661, 49), (795, 75), (842, 108), (849, 200),
-            (764, 248), (620, 252), (589, 302), (587, 389), (792, 398), (859, 443),
-            (855, 654), (842, 773), (708, 781), (661, 712), (655, 627), (610, 582),
-            (541, 578), (473, 581), (443, 535), (445, 425),
-        ]
-
-        level3_alt_path = [
-            (444, 235), (323, 227), (284, 189), (277, 101), (231, 43), (96, 49),
-            (56, 103), (52, 281), (122, 316), (239, 356), (231, 430), (178, 472),
-            (97, 473), (48, 520), (47, 685), (122, 783), (312, 804), (477, 819),
-            (654, 818), (653, 628), (608, 581), (482, 577), (443, 535), (444, 425),
-        ]
-
-        RACING_LINE = level3_path
-
-        DFS_RACING_LINE = level3_alt_path
-        BFS_RACING_LINE = level3_alt_path
-        ASTAR_RACING_LINE = level3_path
-        GBFS_RACING_LINE = level3_path
-
-
-    elif level == 4:
-        print("Loading level 4")
-        background_img = "assets/red.jpg"
-        background_img = scale_image(pygame.image.load(background_img), 1.5)
-
-        track_img = "assets/track4.png"
-        border_img = "assets/track_border4.png"
-
-        FINISH_POSITION = (270, 265)
-        START_POSITION = (320, 180)
-
-        level4_path = [
-            (318, 157), (359, 116), (472, 115), (535, 62), (653, 59), (637, 194),
-            (589, 234), (489, 245), (455, 300), (459, 377), (578, 388), (589, 490),
-            (632, 528), (763, 532), (765, 781), (719, 833), (499, 832), (195, 827),
-            (139, 783), (157, 578), (61, 493), (67, 352), (190, 350), (284, 354),
-            (323, 247),
-        ]
-
-        LEVEL4_GBFS_PLAYER_ALT_RACING_LINE = [
-            (321, 152), (358, 117), (473, 115), (531, 64), (652, 55), (639, 191),
-            (593, 236), (488, 249), (454, 307), (459, 372), (443, 435), (407, 469),
-            (315, 477), (275, 509), (272, 587), (326, 651), (453, 654), (512, 701),
-            (515, 834), (199, 824), (136, 782), (153, 585), (64, 494), (66, 349),
-            (186, 350), (281, 353), (320, 246),
-        ]
-
-        RACING_LINE = level4_path
-        DFS_RACING_LINE = level4_path
-        BFS_RACING_LINE = level4_path
-        ASTAR_RACING_LINE = level4_path
-        GBFS_RACING_LINE = level4_path
-    else:
-        raise ValueError(f"Unknown level: {level}")
+    assets = get_level_assets(level)
+    definition = LEVEL_DEFINITIONS[level]
 
-    BACKGROUND = background_img
-    TRACK = scale_image(pygame.image.load(track_img), 1)
-    TRACK_BORDER = scale_image(pygame.image.load(border_img), 1)
-    TRACK_BORDER_MASK = pygame.mask.from_surface(TRACK_BORDER)
+    FINISH_POSITION = definition["finish_position"]
+    START_POSITION = definition["start_position"]
 
-    GRID = build_grid(TRACK_BORDER_MASK)
+    RACING_LINE = definition["racing_line"]
+    DFS_RACING_LINE = definition.get("dfs_racing_line", RACING_LINE)
+    BFS_RACING_LINE = definition.get("bfs_racing_line", RACING_LINE)
+    ASTAR_RACING_LINE = definition.get("astar_racing_line", RACING_LINE)
+    GBFS_RACING_LINE = definition.get("gbfs_racing_line", RACING_LINE)
+    LEVEL2_DFS_PLAYER_ALT_RACING_LINE = definition.get("level2_dfs_player_alt_racing_line", [])
+    LEVEL4_GBFS_PLAYER_ALT_RACING_LINE = definition.get("level4_gbfs_player_alt_racing_line", [])
 
-    global FINISH, FINISH_MASK
-    FINISH = pygame.image.load("assets/finish.png")
-    FINISH_MASK = pygame.mask.from_surface(FINISH)
-
-    images[:] = [
-        (BACKGROUND, (0, 0)),
-        (TRACK, (0, 0)),
-        (FINISH, FINISH_POSITION),
-        (TRACK_BORDER, (0, 0)),
-    ]
+    _use_level_assets(assets)
 
     update_spawn_positions()
 
@@ -443,7 +594,11 @@ class GameInfo:
 
     def start_level(self):
         self.started = True
-        self.level_start_time = time.time()
+        self.level_start_time = SIM_CLOCK.time
+
+    def get_level_time(self):
+        """Sim seconds since start_level(), the same on any machine."""
+        return SIM_CLOCK.time - self.level_start_time
 
 # --------------------------------------------------
 # Car factories
@@ -457,7 +612,8 @@ def create_player_car(color="Red", autonomous=False):
     """
     if autonomous:
         from cars import dijkstra_car
-        car_image = CAR_COLOR_MAP.get(color, RED_CAR)
+        _ensure_track()
+        car_image = get_car_image(color, "Red")
         return dijkstra_car.DijkstraCar(
             car_image,
             START_POSITION,
@@ -472,13 +628,13 @@ def create_player_car(color="Red", autonomous=False):
         )
     else:
         from cars import PlayerCar
-        car_image = CAR_COLOR_MAP.get(color, RED_CAR)
+        car_image = get_car_image(color, "Red")
         path = (RACING_LINE + [FINISH_POSITION]) if autonomous else [] # Legacy automated support
         return PlayerCar(car_image, START_POSITION, 3.2, 4, path=path, autonomous=autonomous)
 
 def create_computer_car(type='DFS', color="Grey"):
     from cars import ComputerCar
-    car_image = CAR_COLOR_MAP.get(color, GREY_CAR if type == 'DFS' else BLUE_CAR)
+    car_image = get_car_image(color, "Grey" if type == 'DFS' else "Blue")
     if type == 'BFS':
         path = BFS_RACING_LINE
     else:
@@ -487,19 +643,21 @@ def create_computer_car(type='DFS', color="Grey"):
 
 def create_GBFS_car(color="Green"):
     from cars import GBFSDetourCar
-    car_image = CAR_COLOR_MAP.get(color, GREEN_CAR)
+    _ensure_track()
+    car_image = get_car_image(color, "Green")
     car = GBFSDetourCar(
         GBFS_RACING_LINE + [FINISH_POSITION], 2.5, 4,
         GRID_SIZE, 30,
         CHECKPOINT_RADIUS, GRID, TRACK_BORDER_MASK,
-        car_image
+        car_image, CLEARANCE=TRACK_CLEARANCE
     )
     car.x, car.y = START_POSITION
     return car
 
 def create_neat_car(color="Purple"):
     from cars import NEATCar
-    car_image = CAR_COLOR_MAP.get(color, PURPLE_CAR)
+    _ensure_track()
+    car_image = get_car_image(color, "Purple")
     return NEATCar(
         car_image,
         START_POSITION,
@@ -507,10 +665,34 @@ def create_neat_car(color="Purple"):
         RACING_LINE, TRACK_BORDER_MASK, GRID_SIZE, GRID
     )
 
-def create_dijkstra_car(max_vel=2.5, rotation_vel=4, color="White"):
+def create_dijkstra_car(max_vel=2.5, rotation_vel=4, color="White", planner="flow"):
     from cars import DijkstraCar
-    car_image = CAR_COLOR_MAP.get(color, WHITE_CAR)
+    _ensure_track()
+    car_image = get_car_image(color, "White")
     return DijkstraCar(
+        car_image,
+        START_POSITION,
+        max_vel,
+        rotation_vel,
+        ASTAR_RACING_LINE + [FINISH_POSITION],
+        GRID_SIZE,
+        50,
+        CHECKPOINT_RADIUS,
+        GRID,
+        TRACK_BORDER_MASK,
+        planner=planner
+    )
+
+def create_astar_car(max_vel=2.5, rotation_vel=4, color="White"):
+    """DijkstraCar that runs a real A* search at every checkpoint."""
+    return create_dijkstra_car(max_vel, rotation_vel, color, planner="astar")
+
+def create_jps_car(max_vel=2.5, rotation_vel=4, color="White"):
+    """DijkstraCar that runs Jump Point Search at every checkpoint."""
+    from cars import JPSCar
+    _ensure_track()
+    car_image = get_car_image(color, "White")
+    return JPSCar(
         car_image,
         START_POSITION,
         max_vel,
@@ -526,7 +708,23 @@ def create_dijkstra_car(max_vel=2.5, rotation_vel=4, color="White"):
 # --------------------------------------------------
 # Raycast
 # --------------------------------------------------
+def raycast_field_for(mask):
+    """
+    The distance field raycast_mask sphere-traces for ``mask``, or None when
+    it marches the mask instead. The field belongs to the current border
+    mask; any other mask (e.g. one kept from a previous level) is marched.
+    """
+    current = _CURRENT_LEVEL
+    if RAYCAST_MODE == "sdf" and current is not None and mask is current.track_border_mask:
+        return current.distance_field
+    return None
+
+
 def raycast_mask(mask, origin, angle, max_distance=800, step=3):
+    field = raycast_field_for(mask)
+    if field is not None:
+        return raycast_field(field, origin, angle, max_distance)
+
     ox, oy = origin
     dx, dy = math.cos(angle), math.sin(angle)
 
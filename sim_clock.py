@@ -0,0 +1,59 @@
+"""
+Fixed-timestep simulation clock.
+
+Car physics move a fixed amount per ``move()`` call, so one call is one sim
+step of ``1 / hz`` seconds. The game loop turns real frame time into a whole
+number of steps with ``advance`` and keeps the remainder, so the sim runs at
+the same rate (or any multiple of it) on any machine, and NEAT fitness,
+integrated with the fixed ``dt``, no longer depends on the frame rate.
+Headless runs skip the clock and step as fast as they can, with the same
+outcome.
+
+``alpha`` is how far real time has got into the next, not yet simulated
+step. Cars are drawn that far between their last two sim poses (see
+AbstractCar.render_pose) so motion stays smooth when frames and steps
+do not line up.
+"""
+
+MAX_FRAME_DT = 0.25  # longer frames (window drags, breakpoints) are clamped to this
+
+
+class SimClock:
+    """Turns real frame time into fixed sim steps of ``dt`` seconds."""
+
+    def __init__(self, hz=60):
+        self.hz = hz
+        self.dt = 1.0 / hz
+        self.steps = 0            # sim steps handed out by advance()
+        self._accumulator = 0.0   # real time not yet simulated, in seconds
+
+    @property
+    def time(self):
+        """Sim seconds handed out by advance()."""
+        return self.steps * self.dt
+
+    @property
+    def alpha(self):
+        """Fraction (0..1) of the next step that real time has already reached."""
+        return min(self._accumulator / self.dt, 1.0)
+
+    def advance(self, real_dt, speed=1.0, max_steps=None):
+        """
+        Add ``real_dt`` seconds of real time, run at ``speed`` times real time,
+        and return how many sim steps to run now. Past ``max_steps`` the
+        leftover time is dropped, so the sim falls behind real time instead of
+        making the next frame slower still.
+        """
+        self._accumulator += min(real_dt, MAX_FRAME_DT) * speed
+        n = int(self._accumulator / self.dt)
+        if max_steps is not None and n > max_steps:
+            n = max_steps
+            self._accumulator = 0.0
+        else:
+            self._accumulator -= n * self.dt
+        self.steps += n
+        return n
+
+    def reset(self):
+        """Drop any real time not yet simulated (e.g. when a race starts)."""
+        self._accumulator = 0.0
@@ -0,0 +1,128 @@
+"""
+Per-sprite rotation atlases.
+
+Car sprites never change after loading, yet drawing and collision code used
+to rotate the surface or rebuild a mask from it on every call.
+``atlas_for(img)`` returns one shared ``SpriteAtlas`` per surface holding the
+sprite pre-rotated to ROTATION_STEPS quantised angles, plus masks of those
+rotations. Each slot is built the first time it is needed.
+``pose_collides`` answers "does this sprite at (x, y, angle) overlap a
+mask?" from the same tables, for any car.
+"""
+
+import weakref
+
+import pygame
+
+COLLISION_SCALE = 0.85  # Collision masks are shrunk to forgive near misses
+ROTATION_STEPS = 360    # Quantised angles per full turn in rotated tables
+
+_ATLASES = weakref.WeakKeyDictionary()  # Surface -> SpriteAtlas
+
+
+def atlas_for(img):
+    """The shared SpriteAtlas for surface ``img``."""
+    atlas = _ATLASES.get(img)
+    if atlas is None:
+        atlas = SpriteAtlas(img)
+        _ATLASES[img] = atlas
+    return atlas
+
+
+def pose_collides(img, x, y, angle, mask):
+    """
+    True if sprite ``img`` with its top-left at (x, y), drawn rotated by
+    ``angle`` degrees about its centre, would overlap ``mask``. Answered from
+    the atlas's quantised rotation masks, so nothing is rotated per call.
+    """
+    car_mask, offset = atlas_for(img).pose_mask(x, y, angle)
+    return mask.overlap(car_mask, offset) is not None
+
+
+def angle_index(angle, steps=ROTATION_STEPS):
+    """Nearest quantised angle slot for ``angle`` in degrees."""
+    return int(round(angle * steps / 360.0)) % steps
+
+
+class SpriteAtlas:
+    """Rotated surfaces and masks of one sprite; slots are built on first use."""
+
+    def __init__(self, img, steps=ROTATION_STEPS):
+        self.size = img.get_size()
+        self.steps = steps
+        self._img = weakref.ref(img)
+        self._collision_mask = None
+        self._rotated = [None] * steps
+        self._rotated_masks = [None] * steps
+        self._rotated_collision = [None] * steps
+        self._pose_masks = [None] * steps
+
+    def rotated(self, angle):
+        """The sprite rotated counter-clockwise by ``angle`` degrees (quantised)."""
+        i = angle_index(angle, self.steps)
+        surf = self._rotated[i]
+        if surf is None:
+            surf = pygame.transform.rotate(self._img(), i * 360.0 / self.steps)
+            if pygame.display.get_surface() is not None:
+                surf = surf.convert_alpha()
+            self._rotated[i] = surf
+        return surf
+
+    def rotated_mask(self, angle):
+        """Full-size mask of ``rotated(angle)``."""
+        i = angle_index(angle, self.steps)
+        mask = self._rotated_masks[i]
+        if mask is None:
+            mask = pygame.mask.from_surface(self.rotated(angle))
+            self._rotated_masks[i] = mask
+        return mask
+
+    def pose_mask(self, x, y, angle):
+        """
+        ``(mask, (left, top))`` of the sprite with its unrotated top-left at
+        (x, y), rotated by ``angle`` about its centre as blit_rotate_center
+        draws it; ready for ``other.overlap(mask, (left, top))``. Positions
+        are rounded exactly as pygame.Rect rounds them.
+        """
+        i = angle_index(angle, self.steps)
+        entry = self._pose_masks[i]
+        if entry is None:
+            rw, rh = self.rotated(angle).get_size()
+            w, h = self.size
+            entry = (self.rotated_mask(angle), w // 2 - rw // 2, h // 2 - rh // 2)
+            self._pose_masks[i] = entry
+        mask, dx, dy = entry
+        return mask, (_rect_round(x) + dx, _rect_round(y) + dy)
+
+    @property
+    def collision_mask(self):
+        """Unrotated mask scaled by COLLISION_SCALE, as AbstractCar.collide uses it."""
+        if self._collision_mask is None:
+            self._collision_mask = _scaled_mask(pygame.mask.from_surface(self._img()))
+        return self._collision_mask
+
+    def rotated_collision_mask(self, angle):
+        """
+        ``(mask, (dx, dy))`` for the sprite rotated by ``angle`` (quantised),
+        where (dx, dy) places the mask relative to the sprite's top-left so
+        both share a centre.
+        """
+        i = angle_index(angle, self.steps)
+        entry = self._rotated_collision[i]
+        if entry is None:
+            mask = _scaled_mask(self.rotated_mask(angle))
+            mw, mh = mask.get_size()
+            w, h = self.size
+            entry = (mask, (w / 2 - mw / 2, h / 2 - mh / 2))
+            self._rotated_collision[i] = entry
+        return entry
+
+
+def _rect_round(v):
+    # pygame.Rect rounds float positions half away from zero.
+    return int(v + 0.5) if v >= 0 else -int(-v + 0.5)
+
+
+def _scaled_mask(mask):
+    w, h = mask.get_size()
+    return mask.scale((int(w * COLLISION_SCALE), int(h * COLLISION_SCALE)))
@@ -0,0 +1,284 @@
+"""
+NumPy views of the track border mask.
+
+The planners and sensors only ever ask "is this pixel / cell a wall?", so the
+border mask is converted once per level into plain arrays they can index or
+slice without going through ``pygame.Mask.get_at``.
+"""
+
+import math
+
+import numpy as np
+import pygame
+
+# Distances further than this from a wall are stored as this value. Sphere
+# tracing only needs a safe lower bound, and the cap bounds the build cost.
+DISTANCE_FIELD_CAP = 64
+
+
+def mask_to_array(mask):
+    """Return ``mask`` as a (height, width) bool array, True where a bit is set."""
+    # Unset bits become fully transparent black, i.e. a 0 pixel value.
+    surf = mask.to_surface(unsetcolor=(0, 0, 0, 0))
+    pixels = pygame.surfarray.pixels2d(surf)
+    try:
+        # surfarray is indexed [x, y]; transpose so rows are y like the grid.
+        return np.ascontiguousarray(pixels.T != 0)
+    finally:
+        del pixels  # release the surface lock
+
+
+class OccupancyGrid:
+    """
+    Walkable cells of a track sampled every ``cell_size`` pixels.
+
+    - ``array`` is a contiguous (rows, cols) bool array, True = free, for bulk
+      slicing and vectorised work.
+    - ``free`` holds the same cells as flat bytes so hot loops can test a cell
+      with one lookup: ``free[r * cols + c]``.
+    - ``grid[r]`` still returns a list row, so ``grid[r][c]`` keeps working
+      for callers written against the old list-of-lists grid.
+    """
+
+    def __init__(self, array, cell_size):
+        self.array = np.ascontiguousarray(array, dtype=bool)
+        self.cell_size = cell_size
+        self.rows, self.cols = self.array.shape
+        self.free = self.array.tobytes()
+        self._row_lists = None
+
+    @classmethod
+    def from_mask(cls, mask, cell_size):
+        """Sample the top-left pixel of every cell, like the old ``build_grid``."""
+        walls = mask_to_array(mask)
+        return cls(~walls[::cell_size, ::cell_size], cell_size)
+
+    def is_free(self, r, c):
+        """True if (r, c) is inside the grid and walkable."""
+        return 0 <= r < self.rows and 0 <= c < self.cols and self.free[r * self.cols + c] == 1
+
+    def tolist(self):
+        """Rows as lists of bools (built once, then shared)."""
+        if self._row_lists is None:
+            self._row_lists = self.array.tolist()
+        return self._row_lists
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self.tolist()[key]
+        return self.array[key]
+
+
+def distance_field(walls, cap=DISTANCE_FIELD_CAP):
+    """
+    Euclidean distance (in pixels) from every pixel to the nearest wall pixel.
+
+    ``walls`` is a (height, width) bool array. Walls are 0 and values are exact
+    up to ``cap``; anything further away is stored as ``cap``.
+    """
+    h, w = walls.shape
+    cap = float(cap)
+    far = np.float32(h + w + cap)
+
+    # Pass 1: distance to the nearest wall in the same column.
+    ys = np.arange(h, dtype=np.float32)[:, None]
+    above = np.where(walls, ys, -far)
+    np.maximum.accumulate(above, axis=0, out=above)
+    below = np.where(walls, ys, far + h)[::-1]
+    below = np.minimum.accumulate(below, axis=0)[::-1]
+    g = np.minimum(ys - above, below - ys)
+    np.minimum(g, cap, out=g)
+    g2 = g * g
+
+    # Pass 2: d(x)^2 = min over nearby columns x' of (x - x')^2 + g(x')^2.
+    # Columns further than ``cap`` away cannot beat the cap, so skip them.
+    d2 = g2.copy()
+    for dx in range(1, min(int(math.ceil(cap)), w - 1) + 1):
+        off = np.float32(dx * dx)
+        np.minimum(d2[:, dx:], g2[:, :-dx] + off, out=d2[:, dx:])
+        np.minimum(d2[:, :-dx], g2[:, dx:] + off, out=d2[:, :-dx])
+
+    field = np.sqrt(d2)
+    np.minimum(field, cap, out=field)
+    return field
+
+
+def raycast_field(field, origin, angle, max_distance=800, min_step=1.0):
+    """
+    Sphere-trace a ray through a distance field.
+
+    Each step jumps by the stored clearance, less the ~1.4 px a point can sit
+    away from the pixel it falls in, so open track is crossed in a few jumps.
+    Next to a wall the ray creeps forward by ``min_step`` pixels, which is
+    finer than the fixed 3 px march. Returns the same dict as
+    ``resources.raycast_mask``.
+    """
+    h, w = field.shape
+    ox, oy = origin
+    dx, dy = math.cos(angle), math.sin(angle)
+
+    dist = 0.0
+    while dist < max_distance:
+        px = int(ox + dx * dist)
+        py = int(oy + dy * dist)
+
+        if not (0 <= px < w and 0 <= py < h):
+            break
+
+        clearance = float(field[py, px])
+        if clearance == 0.0:
+            return {"hit": True, "distance": dist, "point": (px, py)}
+
+        dist += max(clearance - 1.5, min_step)
+
+    return {"hit": False, "distance": max_distance, "point": None}
+
+
+_SCALAR_TAIL = 32  # raycast_batch finishes this many stragglers ray by ray
+
+
+def _ray_directions(angles):
+    # math.cos/sin rather than np.cos/sin: bit-for-bit what the single-ray
+    # casters use, so batched and per-car sensing agree exactly.
+    dx = np.fromiter((math.cos(a) for a in angles), dtype=np.float64, count=len(angles))
+    dy = np.fromiter((math.sin(a) for a in angles), dtype=np.float64, count=len(angles))
+    return dx, dy
+
+
+def raycast_batch(field, origins, angles, max_distance=800, min_step=1.0):
+    """
+    ``raycast_field`` for many rays at once: every ray sphere-traces ``field``
+    in lockstep, one vectorised step per iteration, until all have hit a wall,
+    left the image or reached ``max_distance``. Each ray takes exactly the
+    steps ``raycast_field`` would, so the distances are identical.
+
+    ``origins`` is an (N, 2) array of (x, y) and ``angles`` an (N,) array in
+    radians (0 along +X). Returns ``(distances, hits)``: float (N,) and bool
+    (N,) arrays; misses report ``max_distance``.
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+    angles = np.asarray(angles, dtype=np.float64).reshape(-1)
+    h, w = field.shape
+    n = len(angles)
+    dx, dy = _ray_directions(angles)
+
+    distances = np.full(n, float(max_distance))
+    hits = np.zeros(n, dtype=bool)
+
+    # Rays still marching, as compact arrays; rays that end are dropped.
+    live = np.arange(n if max_distance > 0 else 0)
+    ox, oy = origins[:, 0].copy(), origins[:, 1].copy()
+    rdx, rdy = dx, dy
+    dist = np.zeros(n)
+    while len(live) > _SCALAR_TAIL:
+        # astype(intp) truncates toward zero, same as int() in raycast_field.
+        px = (ox + rdx * dist).astype(np.intp)
+        py = (oy + rdy * dist).astype(np.intp)
+        inside = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+        clearance = field[np.clip(py, 0, h - 1), np.clip(px, 0, w - 1)].astype(np.float64)
+        wall = inside & (clearance == 0.0)
+        dist_next = dist + np.maximum(clearance - 1.5, min_step)
+        go = inside & ~wall & (dist_next < max_distance)
+        if wall.any():
+            distances[live[wall]] = dist[wall]
+            hits[live[wall]] = True
+        if not go.all():
+            live, ox, oy, rdx, rdy, dist_next = (
+                live[go], ox[go], oy[go], rdx[go], rdy[go], dist_next[go])
+        dist = dist_next
+
+    # The last few rays (creeping along a wall) would cost a whole vectorised
+    # step each; finish them one at a time with the same arithmetic instead.
+    for k, i in enumerate(live.tolist()):
+        x0, y0 = ox.item(k), oy.item(k)
+        ddx, ddy = rdx.item(k), rdy.item(k)
+        d = dist.item(k)
+        while d < max_distance:
+            px = int(x0 + ddx * d)
+            py = int(y0 + ddy * d)
+            if not (0 <= px < w and 0 <= py < h):
+                break
+            clearance = float(field[py, px])
+            if clearance == 0.0:
+                distances[i] = d
+                hits[i] = True
+                break
+            d += max(clearance - 1.5, min_step)
+    return distances, hits
+
+
+def march_batch(mask_array, origins, angles, max_distance=800, step=3):
+    """
+    Cast many rays at once with the same fixed-step march as ``raycast_mask``
+    uses when it has no distance field.
+
+    ``mask_array`` is a (height, width) bool wall array; ``origins``,
+    ``angles`` and the return value are as for ``raycast_batch``. Every
+    sample of every ray is looked up in one fancy-index, so the cost grows
+    with array size rather than with the number of Python calls.
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+    angles = np.asarray(angles, dtype=np.float64).reshape(-1)
+    h, w = mask_array.shape
+    dx, dy = _ray_directions(angles)
+
+    ts = np.arange(0.0, max_distance, step)
+    # astype(intp) truncates toward zero, same as int() in raycast_mask.
+    px = (origins[:, 0, None] + dx[:, None] * ts).astype(np.intp)
+    py = (origins[:, 1, None] + dy[:, None] * ts).astype(np.intp)
+
+    inside = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+    wall = np.zeros(px.shape, dtype=bool)
+    wall[inside] = mask_array[py[inside], px[inside]]
+
+    # A ray ends at its first wall sample or its first sample off the image.
+    stop = wall | ~inside
+    first = stop.argmax(axis=1)
+    hits = wall[np.arange(len(angles)), first]
+    distances = np.where(hits, ts[first] if len(ts) else 0.0, float(max_distance))
+    return distances, hits
+
+
+def clearance_map(walls, cell_size, radius=6, step=2):
+    """
+    Fraction of open samples around every grid cell centre.
+
+    Matches the GBFS car's ``_clearance_at``: the (2*radius/step + 1)^2 pixels
+    spaced ``step`` apart around ``(c * cell_size + cell_size // 2,
+    r * cell_size + cell_size // 2)``, ignoring samples off the image. All
+    cells are done at once with box sums over an integral image of the
+    sampled pixels. Returns a float32 (rows, cols) array in [0, 1].
+    """
+    if cell_size % step:
+        raise ValueError("cell_size must be a multiple of step")
+    h, w = walls.shape
+    rows, cols = -(-h // cell_size), -(-w // cell_size)
+    half = cell_size // 2
+    k = radius // step
+
+    # Every sample lands on pixels congruent to the centre modulo `step`.
+    off = half % step
+    sampled = walls[off::step, off::step]
+    sh, sw = sampled.shape
+
+    def box_sums(values):
+        integral = np.zeros((sh + 1, sw + 1), dtype=np.int32)
+        np.cumsum(np.cumsum(values, axis=0, dtype=np.int32), axis=1, out=integral[1:, 1:])
+        r = (np.arange(rows) * cell_size + half - off) // step
+        c = (np.arange(cols) * cell_size + half - off) // step
+        r0, r1 = np.clip(r - k, 0, sh), np.clip(r + k + 1, 0, sh)
+        c0, c1 = np.clip(c - k, 0, sw), np.clip(c + k + 1, 0, sw)
+        return (integral[r1[:, None], c1[None, :]] - integral[r0[:, None], c1[None, :]]
+                - integral[r1[:, None], c0[None, :]] + integral[r0[:, None], c0[None, :]])
+
+    samples = box_sums(np.ones(sampled.shape, dtype=np.int32))
+    hits = box_sums(sampled.astype(np.int32))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        clearance = np.where(samples > 0, 1.0 - hits / np.maximum(samples, 1), 0.0)
+    return clearance.astype(np.float32)
@@ -0,0 +1,141 @@
+"""
+Binary track packages written by ``compile_track.py``.
+
+Layout::
+
+    b"DFATRK01"                magic
+    uint32 little-endian       length of the JSON header
+    JSON header                {"meta": {...}, "arrays": {name: {dtype, shape, offset}}}
+    array data                 each array C-contiguous, starting on a 64-byte boundary
+
+Loading maps the file with ``mmap`` and hands out read-only NumPy views, so
+opening a package costs a header parse and nothing is copied until used.
+"""
+
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+try:
+    import mmap
+except ImportError:  # e.g. the WebAssembly build; fall back to reading the file
+    mmap = None
+
+MAGIC = b"DFATRK01"
+FORMAT_VERSION = 1
+_ALIGN = 64
+
+
+def file_digest(path):
+    """SHA-1 of a file's bytes; packages record it for their source border PNG."""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def write_track_package(path, meta, arrays):
+    """Write ``arrays`` (name -> ndarray) and the JSON-able ``meta`` to ``path``."""
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+    meta = dict(meta, version=FORMAT_VERSION)
+
+    # Offsets depend on the header length, which depends on the offsets, so
+    # lay out with a generous header first and grow until it fits.
+    reserve = 4096
+    while True:
+        offset = reserve
+        specs = {}
+        for name, a in arrays.items():
+            offset = -(-offset // _ALIGN) * _ALIGN
+            specs[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+            offset += a.nbytes
+        header = json.dumps({"meta": meta, "arrays": specs}).encode("utf-8")
+        if len(MAGIC) + 4 + len(header) <= reserve:
+            break
+        reserve *= 2
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for name, a in arrays.items():
+            f.seek(specs[name]["offset"])
+            f.write(a.tobytes())
+    os.replace(tmp, path)
+
+
+class TrackPackage:
+    """Read-only, memory-mapped view of a compiled track package."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if mmap is not None:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._mmap = f.read()
+
+        if bytes(self._mmap[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a track package")
+        (header_len,) = struct.unpack_from("<I", self._mmap, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(self._mmap[start:start + header_len].decode("utf-8"))
+
+        self.meta = header["meta"]
+        self._specs = header["arrays"]
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path} has unsupported version {self.meta.get('version')}")
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def names(self):
+        return list(self._specs)
+
+    def array(self, name):
+        """Zero-copy read-only view of section ``name``."""
+        spec = self._specs[name]
+        dtype = np.dtype(spec["dtype"])
+        shape = tuple(spec["shape"])
+        count = int(np.prod(shape)) if shape else 1
+        return np.frombuffer(self._mmap, dtype=dtype, count=count,
+                             offset=spec["offset"]).reshape(shape)
+
+    # ---------------- typed accessors ----------------
+    def occupancy(self):
+        """(rows, cols) bool array, True = free, unpacked from the bit-packed grid."""
+        rows, cols = self.meta["grid_shape"]
+        return np.unpackbits(self.array("grid_bits"), axis=1, count=cols).astype(bool)
+
+    def distance_field(self):
+        return self.array("distance_field")
+
+    def clearance(self):
+        return self.array("clearance")
+
+    def racing_line(self, name="racing_line"):
+        """``(points, s)``: (N, 2) vertices and their cumulative arc length in pixels."""
+        line = self.array(f"line/{name}")
+        return line[:, :2], line[:, 2]
+
+    def checkpoint_paths(self, name="racing_line"):
+        """
+        Shortest grid paths between consecutive checkpoints of a racing line
+        (finish position appended, last leg wrapping to the first checkpoint).
+        Returns a list of (M, 2) int arrays of (row, col) cells, one per leg.
+        """
+        cells = self.array(f"paths/{name}/cells")
+        offsets = self.array(f"paths/{name}/offsets")
+        return [cells[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+    def flow_field_loaders(self):
+        """Goal cell -> loader returning that goal's mapped cost-to-goal field."""
+        if "flow/goals" not in self:
+            return {}
+        fields = self.array("flow/fields")
+        return {
+            (int(r), int(c)): (lambda i=i: fields[i])
+            for i, (r, c) in enumerate(self.array("flow/goals"))
+        }
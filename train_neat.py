@@ -0,0 +1,126 @@
+"""
+Headless NEAT trainer.
+
+Runs NEATManager with no window and no frame cap, as fast as the sim steps,
+and writes the best genome where the game loads it from:
+
+    python train_neat.py                          # level 1, 10 generations
+    python train_neat.py --level 3 -g 50 -p 200   # level 3, 50 generations of 200
+    python train_neat.py --resume checkpoints/neat-level1-gen-20 -g 30
+    python train_neat.py -g 100 -p 500 --workers 16  # one process per core
+
+Every ``--checkpoint-every`` generations a ``neat.Checkpointer`` snapshot is
+saved; ``--resume`` continues from one (``-g`` counts the generations still
+to run). After each generation it prints the genome-seconds simulated per
+wall-clock second, to size longer runs by.
+"""
+
+import argparse
+import os
+import pickle
+import time
+
+# The trainer never draws; keep resources from opening a window.
+os.environ.setdefault("DFA_HEADLESS", "1")
+
+import neat
+
+import resources
+from neatmanager import NEATManager
+
+WINNER_PATH = "assets/winner_genome.pkl"  # where main.load_trained_network() looks
+
+
+def load_config(path, pop_size=None):
+    config = neat.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        path,
+    )
+    if pop_size:
+        config.pop_size = pop_size
+    return config
+
+
+def train(level, generations, config, time_limit_sec=50.0, resume=None,
+          checkpoint_every=5, checkpoint_prefix=None, workers=0):
+    """Train on ``level`` for ``generations`` more generations; returns the best genome."""
+    resources.load_track_for_level(level)
+
+    population = neat.Checkpointer.restore_checkpoint(resume, config) if resume else None
+    manager = NEATManager(
+        neat_config=config,
+        car_factory=resources.create_neat_car,
+        track_mask=resources.TRACK_BORDER_MASK,
+        raycast_fn=resources.raycast_mask,
+        fps=resources.FPS,
+        time_limit_sec=time_limit_sec,
+        population=population,
+        workers=workers,
+        level=level,
+    )
+    if checkpoint_every:
+        prefix = checkpoint_prefix or f"checkpoints/neat-level{level}-gen-"
+        os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+        manager.pop.add_reporter(neat.Checkpointer(checkpoint_every, filename_prefix=prefix))
+
+    last_gen = manager.generation + generations
+    try:
+        while manager.generation < last_gen:
+            gen = manager.generation
+            t0 = time.perf_counter()
+            while manager.generation == gen:
+                manager.update()
+            wall = time.perf_counter() - t0
+            sim = manager.last_generation_sim_seconds
+            print(f"Generation {gen}: {sim:.0f} genome-s simulated in {wall:.2f} s "
+                  f"({sim / max(wall, 1e-9):.0f} genome-s per second)")
+    finally:
+        manager.close()
+
+    return manager.winner
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the NEAT driver without rendering.")
+    parser.add_argument("--level", type=int, default=1, choices=sorted(resources.LEVEL_DEFINITIONS),
+                        help="track to train on (default: %(default)s)")
+    parser.add_argument("-g", "--generations", type=int, default=10,
+                        help="generations to run (default: %(default)s)")
+    parser.add_argument("-p", "--pop", type=int, default=None,
+                        help="population size (default: pop_size from the config)")
+    parser.add_argument("--time-limit", type=float, default=50.0,
+                        help="sim seconds each genome may drive (default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=0,
+                        help="worker processes to spread each generation over, 0 for none (default: %(default)s)")
+    parser.add_argument("--config", default="neat_config.ini",
+                        help="NEAT config file (default: %(default)s)")
+    parser.add_argument("--resume", metavar="CHECKPOINT",
+                        help="continue from a neat.Checkpointer file")
+    parser.add_argument("--checkpoint-every", type=int, default=5,
+                        help="generations between checkpoints, 0 for none (default: %(default)s)")
+    parser.add_argument("--checkpoint-prefix", default=None,
+                        help="checkpoint file prefix (default: checkpoints/neat-level<N>-gen-)")
+    parser.add_argument("--out", default=WINNER_PATH,
+                        help="where to write the best genome (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config, args.pop)
+    t0 = time.perf_counter()
+    winner = train(args.level, args.generations, config, args.time_limit, args.resume,
+                   args.checkpoint_every, args.checkpoint_prefix, args.workers)
+    if winner is None:
+        print("No generation finished; nothing written.")
+        return
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "wb") as f:
+        pickle.dump(winner, f)
+    print(f"Best fitness {winner.fitness:.2f} after {time.perf_counter() - t0:.1f} s; "
+          f"genome written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
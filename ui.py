@@ -3,7 +3,6 @@ import pygame
 import csv
 from datetime import datetime
 import resources
-from resources import MENU, MENU2, MENU3, MENU4
 # --------------------------------------------------
 # Utilities
 # --------------------------------------------------
@@ -95,7 +94,7 @@ class Menu:
     # ---------------- MAIN MENU ----------------
     def drawMain(self, surface):
         self.disable_all_buttons()
-        surface.blit(MENU, (0, 0))
+        surface.blit(resources.MENU, (0, 0))
 
         for btn in [
             self.playButton, self.trainButton,
@@ -108,7 +107,7 @@ class Menu:
     # ---------------- LEVEL SELECT ----------------
     def drawLevels(self, surface):
         self.disable_all_buttons()
-        surface.blit(MENU4, (0, 0))
+        surface.blit(resources.MENU4, (0, 0))
 
         hovered_level = None
 
@@ -157,7 +156,7 @@ class Menu:
     # ---------------- PAGE 1 ----------------
     def drawPage1(self, surface):
         self.disable_all_buttons()
-        surface.blit(MENU2, (0, 0))
+        surface.blit(resources.MENU2, (0, 0))
 
         # Start scroll panel
         panel_surf, offset_y = self.info_scroll.begin(surface)
@@ -238,7 +237,7 @@ class Menu:
     # ---------------- PAGE 2 ----------------
     def drawPage2(self, surface):
         self.disable_all_buttons()
-        surface.blit(MENU2, (0, 0))
+        surface.blit(resources.MENU2, (0, 0))
 
         center_x = surface.get_width() // 2
         y = 300
@@ -448,7 +447,7 @@ class IconButton:
 # --------------------------------------------------
 # TODO: Enhance level end screen with more details / options (restart level, main menu, etc.)
 def draw_level_end(win, result, level, time_sec, font):
-    win.blit(MENU3, (0, 0))
+    win.blit(resources.MENU3, (0, 0))
 
     title = "YOU WIN!" if result == "win" else "YOU LOSE"
     color = (0, 200, 0) if result == "win" else (200, 0, 0)